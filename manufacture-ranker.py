@@ -59,7 +59,13 @@ UNIVERSAL_FILTERS = {
 }
 UNIVERSAL_MAIN_OUTPUT_FILTERS = {}
 
+PREFETCH_DATASETS = {'planets', 'exchange_goods', 'price_history', 'population', 'buildings', 'recipes', 'jump_distances'}
+
 def main():
+    # Everything the ranking touches, fetched concurrently up front
+    report = loader.prefetch(PREFETCH_DATASETS)
+    print(f"Prefetched {len(report['fetched'])} datasets, {len(report['cached'])} from cache")
+
     planet_names = get_planet_names()
 
     all_hits = []
@@ -93,7 +99,15 @@ def get_planet_names():
         for code in loader.exchanges.keys():
             planet_names += get_planets_near_exchange(code, blacklist)
     else:
-        planet_names = [planet_name]
+        # A planet name or id, or any unambiguous start of one
+        natural_id = loader.planet_index.match(planet_name)
+        if natural_id is None:
+            suggestions = loader.planet_index.suggest(planet_name)
+            print(f"Unknown planet '{planet_name}'")
+            if suggestions:
+                print(f"Did you mean {', '.join(loader.planet_index.describe(natural_id) for natural_id in suggestions)}?")
+            sys.exit(1)
+        planet_names = [loader.planet_index.names[natural_id]]
 
     print(f"DEBUG: Picked planets {", ".join(planet_names)}")
 
@@ -121,113 +135,114 @@ def analyze_planet(planet_name):
     exchange_code, exchange_distance = planet.get_nearest_exchange()
 
     exchange = prun.loader.get_exchange(exchange_code)
-    all_recipes = prun.loader.get_all_recipes()
-
     hits = []
-    for recipe in all_recipes:
-        recipe = recipe.copy()
+    # Everything but the recipe's own numbers depends only on the building, so it's worked out once per building
+    for building_ticker, building_recipes in prun.loader.recipes.by_building.items():
         base_area = 500-25
-        building = prun.Building(recipe.building, planet)
+        building = prun.Building(building_ticker, planet)
     
-        base_seed = prun.BuildingList({recipe.building: 1}, planet=planet)
+        base_seed = prun.BuildingList({building_ticker: 1}, planet=planet)
         base_seed = base_seed.include_housing('cost')
 
         bonus = building.get_cogc_bonus(planet.cogc)
         #print(f"DEBUG: {bonus}x COGC bonus to {building.ticker} on {planet.name}")
-        recipe.multipliers['cogc'] = bonus
-        # Optionally add expert bonus later
 
         max_count = base_area // base_seed.area
         if max_count <= 0: continue
 
-        upkeep_cost = recipe.get_worker_upkeep_per_craft().get_total_value(exchange.code, 'buy')
-        upkeep_cost -= building.get_cost(exchange.code) / 180
-
-        daily_profit_per_building = recipe.get_profit_per_day(exchange.code)
-        daily_profit_per_building -= upkeep_cost
-
-        profit_ratio = recipe.get_profit_ratio(exchange.code)
-        max_daily_profit = max_count * daily_profit_per_building
-        if daily_profit_per_building <= 0: continue
-
         building_cost = building.get_cost(exchange.code) 
         seed_cost = base_seed.get_total_cost(exchange)
         housing_cost = seed_cost-building_cost
+
+        for recipe in building_recipes:
+            recipe = recipe.copy()
+            recipe.multipliers['cogc'] = bonus
+            # Optionally add expert bonus later
+
+            upkeep_cost = recipe.get_worker_upkeep_per_craft().get_total_value(exchange.code, 'buy')
+            upkeep_cost -= building_cost / 180
+
+            daily_profit_per_building = recipe.get_profit_per_day(exchange.code)
+            daily_profit_per_building -= upkeep_cost
+
+            profit_ratio = recipe.get_profit_ratio(exchange.code)
+            max_daily_profit = max_count * daily_profit_per_building
+            if daily_profit_per_building <= 0: continue
         
-        daily_profit_per_area = daily_profit_per_building / base_seed.area
+            daily_profit_per_area = daily_profit_per_building / base_seed.area
         
-        roi = seed_cost / daily_profit_per_building
-        if roi <= 0: continue
+            roi = seed_cost / daily_profit_per_building
+            if roi <= 0: continue
 
-        #recipe.inputs -= recipe.get_worker_upkeep_per_craft()*2
-        #recipe.inputs = recipe.inputs.prune_negatives()
+            #recipe.inputs -= recipe.get_worker_upkeep_per_craft()*2
+            #recipe.inputs = recipe.inputs.prune_negatives()
 
-        for ticker, count in recipe.inputs.resources.items():
-            supply = exchange.get_good(ticker).supply
-            daily_need = recipe.daily.inputs.resources[ticker]
-            days_available = supply / daily_need
+            for ticker, count in recipe.inputs.resources.items():
+                supply = exchange.get_good(ticker).supply
+                daily_need = recipe.daily.inputs.resources[ticker]
+                days_available = supply / daily_need
         
-        daily_pop_upkeep = building.population_demand.upkeep
-        daily_burn = recipe.daily.inputs + daily_pop_upkeep
-        daily_burn_cost = daily_burn.get_total_value(exchange.code,'buy')
-        period_burn_cost = daily_burn_cost * DAYS_BURN
-        total_investment_cost = seed_cost + period_burn_cost
-        true_roi = total_investment_cost / daily_profit_per_building
-
-        outputs = []
-        for ticker, count in recipe.outputs.resources.items():
-            good = exchange.get_good(ticker)
-            daily_traded = good.daily_traded
-
-            daily_produced = recipe.daily.outputs.resources[ticker]
-
-            if daily_traded > 0:
-                market_saturation_per_building = daily_produced / daily_traded
-            else:
-                market_saturation_per_building = float('inf')
-            # Daily profit per building (global for recipe) / market saturation per building (for this good) 
-            market_suitability = daily_profit_per_building / market_saturation_per_building
-
-            output_data = { # Per building
-                'ticker': ticker,
-                'instant_sell_price': good.sell_price,
-                'patient_sell_price': good.buy_price,
-                'daily_produced': daily_produced,
-                'daily_revenue': daily_produced*good.buy_price,
-                'daily_traded': daily_traded,
-                'market_saturation_per_building': market_saturation_per_building, 
-                'market_suitability': market_suitability,
-                'good': good
-            }
-            outputs.append(output_data)
-
-        hit = {
-            'recipe': recipe,
-            'outputs': outputs,
-            'max_count': max_count,
+            daily_pop_upkeep = building.population_demand.upkeep
+            daily_burn = recipe.daily.inputs + daily_pop_upkeep
+            daily_burn_cost = daily_burn.get_total_value(exchange.code,'buy')
+            period_burn_cost = daily_burn_cost * DAYS_BURN
+            total_investment_cost = seed_cost + period_burn_cost
+            true_roi = total_investment_cost / daily_profit_per_building
+
+            outputs = []
+            for ticker, count in recipe.outputs.resources.items():
+                good = exchange.get_good(ticker)
+                daily_traded = good.daily_traded
+
+                daily_produced = recipe.daily.outputs.resources[ticker]
+
+                if daily_traded > 0:
+                    market_saturation_per_building = daily_produced / daily_traded
+                else:
+                    market_saturation_per_building = float('inf')
+                # Daily profit per building (global for recipe) / market saturation per building (for this good) 
+                market_suitability = daily_profit_per_building / market_saturation_per_building
+
+                output_data = { # Per building
+                    'ticker': ticker,
+                    'instant_sell_price': good.sell_price,
+                    'patient_sell_price': good.buy_price,
+                    'daily_produced': daily_produced,
+                    'daily_revenue': daily_produced*good.buy_price,
+                    'daily_traded': daily_traded,
+                    'market_saturation_per_building': market_saturation_per_building, 
+                    'market_suitability': market_suitability,
+                    'good': good
+                }
+                outputs.append(output_data)
+
+            hit = {
+                'recipe': recipe,
+                'outputs': outputs,
+                'max_count': max_count,
             
-            'profit_ratio': profit_ratio,
-            'daily_profit': daily_profit_per_building,
-            'dppa': daily_profit_per_area,
-            'market-suitability': market_suitability,
-            'max_daily_profit': max_daily_profit,
-            'daily_burn': daily_burn,
-            'daily_burn_cost': daily_burn_cost,
-
-            'building_cost': building_cost,
-            'seed_cost': seed_cost,
-            'housing_cost': housing_cost,
-            'total_investment_cost': total_investment_cost,
-
-            'roi': roi,
-            'true_roi': true_roi,
-
-            'exchange': exchange,
-            'exchange_distance': exchange_distance,
-            'planet': planet
-        }
+                'profit_ratio': profit_ratio,
+                'daily_profit': daily_profit_per_building,
+                'dppa': daily_profit_per_area,
+                'market-suitability': market_suitability,
+                'max_daily_profit': max_daily_profit,
+                'daily_burn': daily_burn,
+                'daily_burn_cost': daily_burn_cost,
+
+                'building_cost': building_cost,
+                'seed_cost': seed_cost,
+                'housing_cost': housing_cost,
+                'total_investment_cost': total_investment_cost,
+
+                'roi': roi,
+                'true_roi': true_roi,
+
+                'exchange': exchange,
+                'exchange_distance': exchange_distance,
+                'planet': planet
+            }
 
-        hits.append(hit)
+            hits.append(hit)
 
     return hits
     
@@ -2,6 +2,7 @@
 
 import json
 import sys
+import numpy as np
 from termcolor import colored
 
 import prunpy as prun
@@ -46,20 +47,21 @@ def parse_arguments():
                 terms['colonized'] = False
             args.remove(arg)
 
+    # Planet names and ids, or any unambiguous start of one
+    planet_index = prun.loader.planet_index
     terms['planet_whitelist'] = []
     for arg in args.copy():
-        planet = None
-        try:
-            planet = prun.loader.get_planet(arg)
-        except:
-            pass
-        
-        if planet is not None:
-            terms['planet_whitelist'].append(planet.natural_id)
+        natural_id = planet_index.match(arg)
+        if natural_id is not None:
+            terms['planet_whitelist'].append(natural_id)
             args.remove(arg)
 
     if len(args) > 0:
         print(f"Unrecognized arguments: {args}")
+        for arg in args:
+            suggestions = planet_index.suggest(arg)
+            if suggestions:
+                print(f"  {arg}: did you mean {', '.join(planet_index.describe(natural_id) for natural_id in suggestions)}?")
         sys.exit(1)
 
     return terms
@@ -129,57 +131,47 @@ def print_terms(terms):
         f"{planet_string}"
     )
 
-def apply_filters(planets, terms):
+def apply_filters(table, terms):
+    """A mask over prun.loader.planet_table of the planets matching every term."""
+    mask = np.ones(len(table), dtype=bool)
 
     if len(terms['planet_whitelist']) > 0:
-        planets = filter_planets(planets, lambda p: p.natural_id in terms['planet_whitelist'], "that aren't in the whitelist")
+        whitelisted = np.zeros(len(table), dtype=bool)
+        whitelisted[table.rows(terms['planet_whitelist'])] = True
+        mask = filter_planets(mask, whitelisted, "that aren't in the whitelist")
 
     if len(terms['resources']) > 0:
-        def resource_condition(planet):
-            planet_resources = [ticker for ticker in planet.resources.keys()]
-            return all(resource in planet_resources for resource in terms['resources'])
-        planets = filter_planets(planets, resource_condition, "that don't have required resources")
+        has_resources = np.all([table.factor(ticker.upper()) > 0 for ticker in terms['resources']], axis=0)
+        mask = filter_planets(mask, has_resources, "that don't have required resources")
 
     if terms['fertility'] is not None:
-        def fertity_condition(planet):
-            if terms['fertility'] is None: return True
-            if planet.environment['fertility'] == -1:
-                fertile = False
-            else:
-                fertile = True
-            return fertile == terms['fertility']
-        planets = filter_planets(planets, fertity_condition, "that aren't fertile")
+        fertile = table.fertility != -1
+        mask = filter_planets(mask, fertile == terms['fertility'], "that aren't fertile")
 
     if terms['colonized'] is not None:
-        def colonized_condition(planet):
-            if terms['colonized'] is None: return True
-            if planet.population.total < COLONIZED_POPULATION_THRESHOLD:
-                colonized = False
-            else:
-                colonized = True
-            return colonized == terms['colonized']
-        planets = filter_planets(planets, colonized_condition, f"that have less than {COLONIZED_POPULATION_THRESHOLD} population")
+        colonized = table.population.sum(axis=1) >= COLONIZED_POPULATION_THRESHOLD
+        mask = filter_planets(mask, colonized == terms['colonized'], f"that have less than {COLONIZED_POPULATION_THRESHOLD} population")
 
-    return planets
+    return mask
 
-def filter_planets(planets, condition, message):
+def filter_planets(mask, condition, message):
     """
-    Filters the planets list based on a given condition and prints a summary message.
+    Narrows a mask of planets down to those meeting a condition and prints a summary message.
 
     Parameters:
-    planets (list): The list of planets to be filtered.
-    condition (function): A function that returns True for elements to keep.
+    mask (ndarray): Which planets are still included, one bool per planet_table row.
+    condition (ndarray): True for planets to keep.
     message (str): The message describing the filter being applied.
 
     Returns:
-    list: The filtered list of planets.
+    ndarray: The narrowed mask.
     """
-    prior_count = len(planets)
-    planets = [planet for planet in planets if condition(planet)]
-    diff = prior_count - len(planets)
-    pct = diff / prior_count * 100
+    prior_count = int(mask.sum())
+    mask = mask & condition
+    diff = prior_count - int(mask.sum())
+    pct = diff / prior_count * 100 if prior_count else 0
     print(f"Removed {diff} ({pct:>.0f}%) planets {message}")
-    return planets
+    return mask
 
 def main():
 
@@ -193,12 +185,10 @@ def main():
 
     print(json.dumps(terms, indent=4))
 
-    planets = prun.loader.get_all_planets()
-    planets = list(planets.values())
-    #if len(terms['planet_whitelist']) > 0:
-        
-
-    planets = apply_filters(planets, terms)
+    # Filtered over the whole planet table, so only the matching planets are built
+    table = prun.loader.planet_table
+    mask = apply_filters(table, terms)
+    planets = [prun.loader.get_planet(natural_id) for natural_id in table.where(mask)]
 
     for planet in planets:
         print_planet_info(planet)
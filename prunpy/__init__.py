@@ -1,29 +1,40 @@
 # prunpy/__init__.py
 
-from .api import fio
-from .api import fio as api
-from .data_loader import loader
-
-# Import key classes from the models package
-from .models.planet import Planet
-from .models.system import System
-from .models.base import Base, RealBase
-from .models.building import Building
-from .models.exchange import Exchange
-from .models.price_history import PriceHistory
-from .models.recipe import Recipe
-from .models.recipe_queue import RecipeQueue, RecipeQueueItem
-from .models.population import Population
-from .models.company import Company
-from .models.material import Material
-from .models.logistics import Container
-from .models import pathfinding
-from .utils.resource_list import ResourceList
-from .utils.building_list import BuildingList
-from .utils.xit_action import XITAction
-from .utils.terminal_formatting import terminal_color_scale
-from .utils.terminal_formatting import terminal_format
-from .utils.terminal_formatting import strip_terminal_formatting
+import sys
+import importlib
+
+# Everything is imported on first access through __getattr__ below, so `import prunpy`
+# doesn't build the API client or pull in the models and their dependencies.
+# Maps each public name to (module, attribute), with None for the module itself.
+_LAZY_ATTRIBUTES = {
+    'fio': ('.api', 'fio'),
+    'api': ('.api', 'fio'),
+    'loader': ('.data_loader', 'loader'),
+
+    # Key classes from the models package
+    'Planet': ('.models.planet', 'Planet'),
+    'System': ('.models.system', 'System'),
+    'Base': ('.models.base', 'Base'),
+    'RealBase': ('.models.base', 'RealBase'),
+    'Building': ('.models.building', 'Building'),
+    'Exchange': ('.models.exchange', 'Exchange'),
+    'PriceHistory': ('.models.price_history', 'PriceHistory'),
+    'Recipe': ('.models.recipe', 'Recipe'),
+    'RecipeQueue': ('.models.recipe_queue', 'RecipeQueue'),
+    'RecipeQueueItem': ('.models.recipe_queue', 'RecipeQueueItem'),
+    'Population': ('.models.population', 'Population'),
+    'Company': ('.models.company', 'Company'),
+    'Material': ('.models.material', 'Material'),
+    'Container': ('.models.logistics', 'Container'),
+    'pathfinding': ('.models.pathfinding', None),
+    'constants': ('.constants', None),
+    'ResourceList': ('.utils.resource_list', 'ResourceList'),
+    'BuildingList': ('.utils.building_list', 'BuildingList'),
+    'XITAction': ('.utils.xit_action', 'XITAction'),
+    'terminal_color_scale': ('.utils.terminal_formatting', 'terminal_color_scale'),
+    'terminal_format': ('.utils.terminal_formatting', 'terminal_format'),
+    'strip_terminal_formatting': ('.utils.terminal_formatting', 'strip_terminal_formatting'),
+}
 
 # Import utility functions
 # from .utils import threshold_round, distance
@@ -36,6 +47,24 @@ __all__ = [
     'ResourceList', 'BuildingList', 'XITAction', 'Population',
     'Container', 'Material', 'Company',
     'terminal_color_scale', 'terminal_format', 'strip_terminal_formatting',
-    
+
     'pathfinding', # Deprecated
 ]
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    module = importlib.import_module(module_name, __name__)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value  # Later lookups skip __getattr__
+
+    # Importing the prunpy.api submodule binds it as prunpy.api, but the name has always meant the client
+    api_module = sys.modules.get(__name__ + '.api')
+    if api_module is not None and globals().get('api') is api_module:
+        globals()['api'] = api_module.fio
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
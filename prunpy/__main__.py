@@ -0,0 +1,37 @@
+import sys
+import time
+import argparse
+
+def snapshot_command(args):
+    from prunpy import snapshot
+    from prunpy.data_loader import loader
+
+    if args.action == 'build':
+        start = time.time()
+        count = snapshot.build(loader, args.contents or tuple(snapshot.SNAPSHOT_CONTENTS), args.path)
+        print(f"Saved {count} cache keys to {args.path} in {time.time() - start:.1f}s")
+    elif args.action == 'load':
+        # Checks what a script would get from the snapshot right now
+        start = time.time()
+        loaded = loader.load_snapshot(args.path)
+        print(f"Loaded {len(loaded)} cache keys from {args.path} in {(time.time() - start)*1000:.0f}ms")
+    elif args.action == 'info':
+        print(snapshot.describe(args.path) or f"No snapshot at {args.path}")
+
+def main():
+    from prunpy.snapshot import SNAPSHOT_FILE, SNAPSHOT_CONTENTS
+
+    parser = argparse.ArgumentParser(prog='python -m prunpy')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    snapshot_parser = commands.add_parser('snapshot', help="Save or load the processed loader data, for fast startup")
+    snapshot_parser.add_argument('action', choices=['build', 'load', 'info'])
+    snapshot_parser.add_argument('--path', default=SNAPSHOT_FILE)
+    snapshot_parser.add_argument('--contents', nargs='+', choices=list(SNAPSHOT_CONTENTS), help="What to build (default: everything)")
+    snapshot_parser.set_defaults(handler=snapshot_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
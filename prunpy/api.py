@@ -1,97 +1,279 @@
 #!/usr/bin/env python3
 
-import requests
 import json
-import pandas as pd
 import re
 import os
-from io import StringIO
+import sys
 from urllib.parse import urlencode, urlparse, quote_plus
-from datetime import datetime, timedelta
 import time
-from collections import deque
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from types import GeneratorType
+from io import BytesIO
+
+from prunpy.cache import ResponseCache
+from prunpy.transport import SessionTransport
+from prunpy.telemetry import RequestStats
+from prunpy.ratelimit import AdaptiveRateLimiter, THROTTLE_STATUSES, backoff_delay
+from prunpy.utils.csv_records import iter_csv_records, get_column_types
+from prunpy.utils.json_records import iter_json_items
 
 MAX_RETRIES = 3
 REQUESTS_PER_RATE_LIMIT = 1
 RATE_LIMIT = 0.5  # seconds
+# The limiter starts at REQUESTS_PER_RATE_LIMIT per RATE_LIMIT seconds, slows down when throttled and recovers up to this
+MAX_REQUESTS_PER_SECOND = REQUESTS_PER_RATE_LIMIT / RATE_LIMIT
+# Shared by every process using the same cache directory; set to None to keep the limiter per process
+RATE_LIMIT_STATE_FILE = './cache/ratelimit.json'
+MAX_CONCURRENT_REQUESTS = 8 # Worker threads (and pooled connections) used by request_many
+MEMO_MAX_ENTRIES = 32 # Parsed responses kept in memory, least recently used dropped first
 
 API_KEY_FILE = './apikey.txt'
+API_BASE_URL = 'https://rest.fnar.net'
+CACHE_DIR = './cache'
+
+def new_rate_limiter(state_file=None):
+    """A limiter at the API's rate limit. Without a state_file, it's private to this process."""
+    return AdaptiveRateLimiter(
+        rate=REQUESTS_PER_RATE_LIMIT / RATE_LIMIT,
+        capacity=REQUESTS_PER_RATE_LIMIT,
+        max_rate=MAX_REQUESTS_PER_SECOND,
+        state_file=state_file,
+    )
+
+def validate_json(payload):
+    """Raise if payload bytes aren't a well-formed JSON document, without keeping the parsed result."""
+    try:
+        import ijson
+    except ImportError:
+        json.loads(payload)
+        return
+    for _ in ijson.parse(BytesIO(payload)):
+        pass
 
 class FIOAPI:
     def __init__(self):
-        self.api_key = self._get_api_key()
-        #if not self.api_key:
-        #    raise ValueError("API key is empty or not read correctly.")
-        self.base_url = "https://rest.fnar.net"
+        # Resolved on the first request that goes to the server, see _ensure_api_key()
+        self.api_key = None
+        self._api_key_lock = threading.Lock()
+        # PRUNPY_BASE_URL points scripts at a local stand-in server (see prunpy.transport)
+        self.base_url = os.environ.get("PRUNPY_BASE_URL", API_BASE_URL)
+        stand_in = self.base_url.rstrip('/') != API_BASE_URL
         self.headers = {
             "accept": "application/json",
         }
-        if self.api_key:
-            self.headers['Authorization'] = self.api_key.strip() # Just the API key, no Bearer prefix
 
-        self.cache_dir = './cache'
-        os.makedirs(self.cache_dir, exist_ok=True)
+        # The cache directory is created by the first write, not here. A stand-in server's responses
+        # are cached apart from the real API's, since cache keys only hold the path
+        self.cache_dir = CACHE_DIR
+        if stand_in:
+            self.cache_dir = os.path.join(CACHE_DIR, f"standin-{re.sub(r'[^A-Za-z0-9.-]+', '_', urlparse(self.base_url).netloc)}")
+        self.cache = ResponseCache(self.cache_dir)
         
-        # Initialize a deque to keep track of request timestamps
-        self.request_times = deque()
+        # Requests go through a transport: one keep-alive session sized for request_many's workers,
+        # or a recording/replay transport from prunpy.transport for offline runs
+        self.transport = SessionTransport(pool_size=MAX_CONCURRENT_REQUESTS)
+
+        # Token bucket shared by all threads (and processes, through RATE_LIMIT_STATE_FILE).
+        # Against a stand-in server it's kept per process, so simulated throttling can't slow real runs
+        self.rate_limiter = new_rate_limiter(None if stand_in else RATE_LIMIT_STATE_FILE)
+
+        # Stale-while-revalidate refreshes, and a version counter per cache key bumped on every new payload
+        self._background_executor = None
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self.versions = {}
+
+        # Requests currently on the wire, keyed by cache key, so concurrent callers share one fetch
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+        # Parsed cached responses, so repeated requests in one run skip the disk read and parse
+        # Keyed by cache key, each tagged with the digest of the payload it was parsed from,
+        # so revalidating an entry (a 304) keeps its parsed result
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+        # Per-endpoint-family counters and timings, see stats()
+        self.telemetry = RequestStats()
+        if os.environ.get('PRUNPY_STATS_FILE'):
+            self.telemetry.dump_at_exit(os.environ['PRUNPY_STATS_FILE'])
+
+    def _ensure_api_key(self):
+        """Resolve the API key once, before the first request sent to the server."""
+        with self._api_key_lock:
+            if self.api_key is None:
+                self.api_key = self._get_api_key()
+                #if not self.api_key:
+                #    raise ValueError("API key is empty or not read correctly.")
+                if self.api_key:
+                    self.headers['Authorization'] = self.api_key.strip() # Just the API key, no Bearer prefix
 
     # Special function to load, prompt, and cache API key
     def _get_api_key(self):
+        # Headless jobs can pass the key through the environment
+        if os.environ.get('PRUNPY_API_KEY'):
+            return os.environ['PRUNPY_API_KEY'].strip()
+
         # If it exists
-        if os.path.exists('./apikey.txt'):
-            with open('./apikey.txt', 'r') as f:
+        if os.path.exists(API_KEY_FILE):
+            with open(API_KEY_FILE, 'r') as f:
                 api_key = f.read().strip()
                 if api_key:
                     return api_key
                 else:
                     pass # Remake file as below
 
+        # Without a terminal to prompt on, carry on unauthenticated; public endpoints still work
+        if not sys.stdin or not sys.stdin.isatty():
+            return ''
+
         # If it doesn't exist
         api_key = input("Enter your API key: ")
-        with open('./apikey.txt', 'w') as f:
+        with open(API_KEY_FILE, 'w') as f:
             f.write(api_key)
-        print(f"Saved API key to ./apikey.txt. Delete it if you want to reset it.")
+        print(f"Saved API key to {API_KEY_FILE}. Delete it if you want to reset it.")
 
         return api_key
 
-    def request(self, method, endpoint, data=None, response_format=None, cache=0, message=None):
+    def request(self, method, endpoint, data=None, response_format=None, cache=0, message=None, lazy=False, on_refresh=None):
+        """
+        Make an API request, served from the response cache when fresh enough.
+
+        cache: 0/False/'never' ignores the cache, -1/True/'forever' always uses it,
+        otherwise the maximum age in seconds. 'swr:<seconds>' returns a stale entry
+        at once and refreshes it in the background, calling on_refresh(result) when
+        the new data arrives. With lazy=True, CSV responses and JSON arrays are
+        returned as a generator of records instead of a list, streamed from the
+        cache file where possible.
+        """
         endpoint = self._strip_base_url(endpoint)
         self._validate_url(endpoint)
 
+        response_format = response_format or self._default_response_format(endpoint)
+        cache_key = self._cache_key(method, endpoint, data, response_format)
+
+        # Stale-while-revalidate behaves like a max age, except when the entry has expired
+        stale_while_revalidate = str(cache).lower().startswith('swr:')
+        if stale_while_revalidate:
+            cache = float(str(cache).split(':', 1)[1])
+
+        # Check if the response is cached, skip rate limiting if cache is being used
+        # Freshness comes from the cache index, so this never touches the filesystem
+        self.telemetry.count(endpoint, 'requests')
+        cache_entry = self.cache.get(cache_key)
+        if cache_entry is not None:
+            if self._is_fresh(cache_entry, cache):
+                result = self._load_cached_file(cache_key, response_format, endpoint, lazy, cache_entry)
+                if result is not None:
+                    self.telemetry.count(endpoint, 'cache_hit')
+                    return result
+                cache_entry = None  # Its file is gone, so there's nothing to revalidate either
+            elif stale_while_revalidate:
+                result = self._load_cached_file(cache_key, response_format, endpoint, lazy, cache_entry)
+                if result is not None:
+                    self.telemetry.count(endpoint, 'cache_stale')
+                    self._refresh_in_background(method, endpoint, data, response_format, cache, cache_key, on_refresh)
+                    return result
+                cache_entry = None
+
+        return self._fetch_once(method, endpoint, data, response_format, cache, cache_key, cache_entry, message, lazy)
+
+    def is_cached(self, method, endpoint, data=None, response_format=None, cache=0, **kwargs):
+        """
+        Whether request() with the same arguments would be answered from the response cache
+        without contacting the server. Other request() arguments are accepted and ignored.
+        """
+        endpoint = self._strip_base_url(endpoint)
+        response_format = response_format or self._default_response_format(endpoint)
+        cache_entry = self.cache.get(self._cache_key(method, endpoint, data, response_format))
+        if cache_entry is None:
+            return False
+        # Stale entries are still returned at once under stale-while-revalidate
+        if str(cache).lower().startswith('swr:'):
+            return True
+        return self._is_fresh(cache_entry, cache)
+
+    def fingerprint(self, method, endpoint, data=None, response_format=None, **kwargs):
+        """
+        A string identifying the content of the cached response to a request, which only changes
+        when different content is stored, or None if it isn't cached. Other request() arguments are ignored.
+        """
+        endpoint = self._strip_base_url(endpoint)
+        response_format = response_format or self._default_response_format(endpoint)
+        cache_key = self._cache_key(method, endpoint, data, response_format)
+        cache_entry = self.cache.get(cache_key)
+        if cache_entry is None:
+            return None
+        if cache_entry['digest'] is None:
+            payload = self.cache.read(cache_key)
+            return None if payload is None else self.cache.store_digest(cache_key, payload)
+        return cache_entry['digest']
+
+    def _is_fresh(self, cache_entry, cache):
+        """Whether a cache entry satisfies a request's cache argument (see request())."""
+        if cache == 0 or cache == False or str(cache).lower() == 'never':
+            return False
+        elif cache == -1 or cache == True or str(cache).lower() == 'always' or str(cache).lower() == 'forever':
+            return True
+        return cache >= 0 and self.cache.age(cache_entry) < cache
+
+    def _default_response_format(self, endpoint):
         # Automatically set response_format to 'csv' if the endpoint starts with 'csv'
-        if response_format is None:
-            response_format = 'csv' if endpoint.strip('/').split('/')[0] == 'csv' else 'json'
+        return 'csv' if endpoint.strip('/').split('/')[0] == 'csv' else 'json'
+
+    def _fetch_once(self, method, endpoint, data, response_format, cache, cache_key, cache_entry, message=None, lazy=False, count_request=True):
+        """
+        Fetch through _fetch, with concurrent callers for the same cache key waiting on
+        one in-flight request instead of each fetching and writing the cache file.
+
+        :param count_request: Count the call as a request's cache miss, or as coalesced if it waited on another.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._inflight[cache_key] = future
+        if count_request:
+            self.telemetry.count(endpoint, 'cache_miss' if is_leader else 'coalesced')
+
+        if not is_leader:
+            result = future.result()
+            # A lazy result can only be consumed once, but it was saved, so read our own copy
+            if isinstance(result, GeneratorType):
+                own_result = self._load_cached_file(cache_key, response_format, endpoint, lazy)
+                if own_result is None:
+                    # Evicted before we could read it
+                    return self._fetch_once(method, endpoint, data, response_format, cache, cache_key, None, message, lazy, count_request=False)
+                return own_result
+            return iter(result) if lazy else result
+
+        try:
+            # Only stay lazy when the payload is saved for other waiters to read
+            result = self._fetch(method, endpoint, data, response_format, cache, cache_key, cache_entry, message, lazy and cache != 0)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[cache_key]
+
+        if lazy and not isinstance(result, GeneratorType):
+            return iter(result)
+        return result
 
+    def _fetch(self, method, endpoint, data, response_format, cache, cache_key, cache_entry, message=None, lazy=False):
+        """Fetch a response from the server, saving it to the cache unless cache is 0."""
         url = f"{self.base_url}{endpoint}"
-        cache_filename = self._generate_cache_filename(url, method, data, response_format)
-        cache_path = os.path.join(self.cache_dir, cache_filename)
 
-        # Check if the response is cached, skip rate limiting if cache is being used
-        if os.path.exists(cache_path):
-            if cache == 0 or cache == False or str(cache).lower() == 'never':
-                pass
-            elif cache == -1 or cache == True or str(cache).lower() == 'always' or str(cache).lower() == 'forever':
-                return self._load_cached_file(cache_path, response_format)
-            elif cache >= 0:
-                cache_age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(cache_path))
-                if cache_age.total_seconds() < cache:
-                    return self._load_cached_file(cache_path, response_format)
-
-        # Apply rate limiting only if the request is not served from cache
-        current_time = time.time()
-
-        # Remove timestamps that are outside of the RATE_LIMIT window
-        while self.request_times and current_time - self.request_times[0] > RATE_LIMIT:
-            self.request_times.popleft()
-
-        # If the number of requests in the last RATE_LIMIT seconds exceeds the allowed limit, delay the request
-        if len(self.request_times) >= REQUESTS_PER_RATE_LIMIT:
-            time_to_wait = RATE_LIMIT - (current_time - self.request_times[0])
-            if time_to_wait > 0:
-                time.sleep(time_to_wait)
-
-        # Record the time of this request
-        self.request_times.append(time.time())
+        # An expired entry can still be revalidated instead of downloaded again
+        self._ensure_api_key()
+        headers = dict(self.headers)
+        if cache_entry is not None and cache != 0:
+            headers.update(self.cache.validators(cache_entry))
 
         # Make a web request
         if type(message) is str:
@@ -101,46 +283,74 @@ class FIOAPI:
 
         for attempt in range(MAX_RETRIES):
             try:
-                if method.upper() == 'GET':
-                    response = requests.get(url, headers=self.headers)
-                elif method.upper() == 'POST':
-                    response = requests.post(url, headers=self.headers, json=data)
-                else:
-                    raise ValueError("Unsupported HTTP method.")
+                # Apply rate limiting only if the request is not served from cache, retries included
+                self.telemetry.observe(endpoint, 'rate_limit_sleep', self._wait_for_rate_limit())
+
+                send_start = time.perf_counter()
+                response = self.transport.send(method, url, headers=headers, data=data)
+                self.telemetry.observe(endpoint, 'network', time.perf_counter() - send_start)
+                self.telemetry.count(endpoint, 'bytes', len(response.content))
+
+                # Not modified since it was cached, so only the entry's TTL needs refreshing
+                if response.status_code == 304 and cache_entry is not None:
+                    self.rate_limiter.on_success(response.headers)
+                    self.telemetry.count(endpoint, 'revalidated')
+                    self.cache.touch(cache_key, ttl=self._cache_ttl(cache))
+                    result = self._load_cached_file(cache_key, response_format, endpoint, lazy)
+                    if result is not None:
+                        break
+                    # The cached file went missing meanwhile, so ask for the full response instead
+                    headers = dict(self.headers)
+                    cache_entry = None
+                    continue
+
+                # Throttled: the limiter slows down and holds every request until Retry-After has passed,
+                # including on the last attempt, so other requests back off even though this one fails
+                if response.status_code in THROTTLE_STATUSES:
+                    retry_delay = self.rate_limiter.on_throttled(response.headers, attempt)
+                    if attempt < MAX_RETRIES - 1:
+                        print(f"Throttled on {endpoint} attempt {attempt + 1}/{MAX_RETRIES}. Retrying in {retry_delay:.1f}s...")
+                        self.telemetry.count(endpoint, 'retries')
+                        continue
 
                 response.raise_for_status()
+                self.rate_limiter.on_success(response.headers)
 
                 # Check if response is empty
                 if not response.text.strip():  # Empty response body
                     raise Exception(f"Empty response from {url}. No data returned by the server.")
 
-                # Save response to cache if caching is enabled
-                if cache != 0:
-                    self._save_to_cache(cache_path, response, response_format)
-
                 result = ""
 
                 # Try to encode the response in the requested format
                 try:
-                    if response_format == 'json':
-                        result = response.json()
-                    elif response_format == 'csv':
-                        df = pd.read_csv(StringIO(response.text))
-                        result = df.to_dict(orient='records')
-                    else:
-                        raise ValueError("Unsupported response format.")
+                    # Streamed JSON is decoded from the raw bytes, without building a str copy first
+                    body = response.content if lazy and response_format == 'json' else response.text
+                    if lazy and response_format == 'json':
+                        # Only parsed as it's consumed, so check it's well-formed before caching it
+                        validate_json(body)
+                    result = self._parse_payload(body, response_format, endpoint, lazy)
+
+                    # Saved only once parsed, so a malformed body (e.g. an HTML error page) is never served from the cache
+                    if cache != 0:
+                        digest = self._save_to_cache(cache_key, response, response_format, ttl=self._cache_ttl(cache))
+                        if digest is not None and not lazy:
+                            self._memo_set(cache_key, digest, result)
                 except Exception as parse_error:
                     if attempt < MAX_RETRIES - 1:
                         print(f"Failed to parse response from {endpoint} attempt {attempt + 1}/{MAX_RETRIES}. Retrying...")
-                        time.sleep(1)
+                        self.telemetry.count(endpoint, 'retries')
+                        time.sleep(backoff_delay(attempt))
                     else:
                         raise Exception(f"Failed to parse response: {str(parse_error)}")
 
             except Exception as request_error:
                 if attempt < MAX_RETRIES - 1:
                     print(f"Failed to fetch {endpoint} attempt {attempt + 1}/{MAX_RETRIES}. Retrying...")
-                    time.sleep(1)
+                    self.telemetry.count(endpoint, 'retries')
+                    time.sleep(backoff_delay(attempt))
                 else:
+                    self.telemetry.count(endpoint, 'errors')
                     raise Exception(f"Failed to fetch data: {str(request_error)}")
 
             if result:
@@ -150,6 +360,87 @@ class FIOAPI:
             print("done")
         return result
 
+    def _refresh_in_background(self, method, endpoint, data, response_format, cache, cache_key, on_refresh=None):
+        """Refetch a stale entry on a background worker. Only one refresh per cache key runs at a time."""
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+            if self._background_executor is None:
+                self._background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='fio-refresh')
+
+        def refresh():
+            try:
+                cache_entry = self.cache.get(cache_key)
+                # Already counted as cache_stale by the request that started it
+                result = self._fetch_once(method, endpoint, data, response_format, cache, cache_key, cache_entry, count_request=False)
+                if on_refresh is not None:
+                    on_refresh(result)
+            except Exception as e:
+                print(f"Background refresh of {endpoint} failed: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+
+        self._background_executor.submit(refresh)
+
+    def version(self, method, endpoint, data=None, response_format=None):
+        """
+        How many times a new payload for this request has been stored during this run.
+        Long-running consumers can poll it to see when a background refresh has landed.
+        """
+        endpoint = self._strip_base_url(endpoint)
+        response_format = response_format or self._default_response_format(endpoint)
+        return self.versions.get(self._cache_key(method, endpoint, data, response_format), 0)
+
+    def stats(self):
+        """Request counters and timing histograms per endpoint family, e.g. '/planet/sites/*'."""
+        return self.telemetry.snapshot()
+
+    def dump_stats_at_exit(self, path):
+        """Write stats() to a JSON file when the process exits. Also enabled by the PRUNPY_STATS_FILE env var."""
+        self.telemetry.dump_at_exit(path)
+
+    def request_dataframe(self, method, endpoint, **kwargs):
+        """Make a request and return the records as a pandas DataFrame. Only this imports pandas."""
+        import pandas as pd
+        return pd.DataFrame(self.request(method, endpoint, **kwargs))
+
+    def request_many(self, requests_list, max_workers=MAX_CONCURRENT_REQUESTS):
+        """
+        Run several independent requests concurrently over the shared session.
+
+        Each entry is either a dict of keyword arguments for request(), or a
+        (method, endpoint) / (method, endpoint, kwargs) tuple. Requests still
+        go through the shared rate limiter, so they start at the rate limit
+        instead of waiting on each other's latency.
+
+        :return: A list of results in the same order as requests_list.
+        """
+        calls = []
+        for entry in requests_list:
+            if isinstance(entry, dict):
+                calls.append(dict(entry))
+            elif len(entry) == 2:
+                calls.append({'method': entry[0], 'endpoint': entry[1]})
+            elif len(entry) == 3:
+                calls.append({'method': entry[0], 'endpoint': entry[1], **entry[2]})
+            else:
+                raise ValueError(f"Invalid request entry: {entry}")
+
+        if not calls:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+            futures = [executor.submit(self.request, **call) for call in calls]
+            return [future.result() for future in futures]
+
+    def _wait_for_rate_limit(self):
+        """Wait for the rate limiter to allow the next request, and return the time slept."""
+        return self.rate_limiter.acquire()
+
+    def _cache_key(self, method, endpoint, data, response_format):
+        return self._generate_cache_filename(f"{self.base_url}{endpoint}", method, data, response_format)
 
     def _generate_cache_filename(self, url, method, data, response_format):
         """Generate a human-readable cache filename based on the request."""
@@ -166,33 +457,112 @@ class FIOAPI:
         filename = f"{filename}.{extension}"
         return quote_plus(filename)  # Ensure the filename is safe for filesystems
 
-    def _load_cached_file(self, cache_path, response_format):
-        """Load the cached file and return its contents."""
-        with open(cache_path, 'r') as cache_file:
-            if response_format == 'json':
-                return json.load(cache_file)
-            elif response_format == 'csv':
-                df = pd.read_csv(StringIO(cache_file.read()))
-                return df.to_dict(orient='records')
-            else:
-                raise ValueError("Unsupported response format.")
+    def _cache_ttl(self, cache):
+        """Convert a request's cache argument into the TTL stored with the entry (None never expires)."""
+        if cache == -1 or cache == True or str(cache).lower() in ['always', 'forever']:
+            return None
+        return float(cache)
+
+    def _load_cached_file(self, cache_key, response_format, endpoint='', lazy=False, cache_entry=None):
+        """
+        Load the cached file and return its contents, or None if the file is gone or can't be
+        parsed. Results parsed earlier in this process from the same version of the file are
+        returned from the memo, shared between callers, so they must not be modified.
+        """
+        cache_entry = cache_entry or self.cache.get(cache_key)
+        digest = cache_entry['digest'] if cache_entry is not None else None
+
+        memoized = self._memo_get(cache_key, digest)
+        if memoized is not None:
+            self.telemetry.count(endpoint, 'memo_hit')
+            return iter(memoized) if lazy else memoized
+
+        # JSON arrays are decoded record by record straight from the (compressed) file
+        if lazy and response_format == 'json':
+            stream = self.cache.open(cache_key)
+            return None if stream is None else self._stream_cached_json(stream)
+
+        read_start = time.perf_counter()
+        payload = self.cache.read(cache_key)
+        if payload is None:
+            return None
+        if digest is None and cache_entry is not None:
+            digest = self.cache.store_digest(cache_key, payload)
+        self.telemetry.observe(endpoint, 'cache_read', time.perf_counter() - read_start)
+        try:
+            result = self._parse_payload(payload.decode('utf-8'), response_format, endpoint, lazy)
+        except Exception as e:
+            # Stored before responses were checked, or corrupted since: fetch it again instead
+            print(f"Dropping unreadable cached response for {endpoint}: {e}")
+            self.cache.remove(cache_key)
+            return None
+        if not lazy:
+            self._memo_set(cache_key, digest, result)
+        return result
 
-    def _save_to_cache(self, cache_path, response, response_format):
-        """Save the API response to a cache file."""
-        # Check if the response is empty
-        if response_format == 'json' and not response.json():
-            return
-        elif response_format == 'csv' and not response.text.strip():
+    def _memo_get(self, cache_key, digest):
+        with self._memo_lock:
+            memoized = self._memo.get(cache_key)
+            if memoized is None or digest is None or memoized[0] != digest:
+                return None
+            self._memo.move_to_end(cache_key)
+            return memoized[1]
+
+    def _memo_set(self, cache_key, digest, result):
+        if digest is None:
             return
+        with self._memo_lock:
+            self._memo[cache_key] = (digest, result)
+            self._memo.move_to_end(cache_key)
+            while len(self._memo) > MEMO_MAX_ENTRIES:
+                self._memo.popitem(last=False)
+
+    def clear_memo(self):
+        """Drop every parsed response kept in memory. The disk cache is untouched."""
+        with self._memo_lock:
+            self._memo.clear()
+
+    def _stream_cached_json(self, stream):
+        with stream:
+            yield from iter_json_items(stream)
+
+    def _parse_payload(self, text, response_format, endpoint='', lazy=False):
+        """Parse a response body. CSV is parsed without pandas, using the endpoint's column types."""
+        parse_start = time.perf_counter()
+        if response_format == 'json':
+            if lazy:
+                return iter_json_items(BytesIO(text if isinstance(text, bytes) else text.encode('utf-8')))
+            result = json.loads(text)
+        elif response_format == 'csv':
+            records = iter_csv_records(text, get_column_types(endpoint))
+            # Lazy records are parsed by the consumer, so there's no parse time to record
+            if lazy:
+                return records
+            result = list(records)
+        else:
+            raise ValueError("Unsupported response format.")
+        self.telemetry.observe(endpoint, 'parse', time.perf_counter() - parse_start)
+        return result
 
-        # Save the response to the cache
-        with open(cache_path, 'w') as cache_file:
-            if response_format == 'json':
-                json.dump(response.json(), cache_file, indent=2)
-            elif response_format == 'csv':
-                cache_file.write(response.text)
-            else:
-                raise ValueError("Unsupported response format.")
+    def _save_to_cache(self, cache_key, response, response_format, ttl=None):
+        """Save the API response to a cache file and record it in the cache index. Returns its digest, or None if not saved."""
+        if response_format not in ['json', 'csv']:
+            raise ValueError("Unsupported response format.")
+
+        # Check if the response is empty
+        # The body is stored as received, so it never needs to be parsed again here
+        payload = response.content
+        if payload.strip() in [b'', b'[]', b'{}', b'null']:
+            return None
+
+        digest = self.cache.write(
+            cache_key, payload, ttl=ttl,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+        with self._refresh_lock:
+            self.versions[cache_key] = self.versions.get(cache_key, 0) + 1
+        return digest
 
 
     def _strip_base_url(self, endpoint):
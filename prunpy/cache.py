@@ -0,0 +1,339 @@
+import os
+import sys
+import gzip
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+
+from prunpy.utils.file_lock import atomic_write
+
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # Total size of cached responses before LRU eviction kicks in
+INDEX_FILENAME = 'index.sqlite3'
+
+# Encoding used for new cache files: 'gzip', 'zstd' (needs the zstandard package), or None for plain files
+CACHE_ENCODING = 'gzip'
+
+# Encoded files start with a small header: magic, format version, codec id
+CACHE_MAGIC = b'PRUN'
+CACHE_FORMAT_VERSION = 1
+CODEC_IDS = {None: 0, 'gzip': 1, 'zstd': 2}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+HEADER_LENGTH = len(CACHE_MAGIC) + 2
+
+def encode_payload(payload, encoding=CACHE_ENCODING):
+    """Compress payload bytes and prefix them with the cache file header."""
+    if encoding == 'zstd':
+        try:
+            import zstandard
+            body = zstandard.ZstdCompressor().compress(payload)
+        except ImportError:
+            encoding = 'gzip'
+    if encoding == 'gzip':
+        body = gzip.compress(payload, compresslevel=5)
+    elif encoding is None:
+        body = payload
+    elif encoding != 'zstd':
+        raise ValueError(f"Unsupported cache encoding: {encoding}")
+
+    header = CACHE_MAGIC + bytes([CACHE_FORMAT_VERSION, CODEC_IDS[encoding]])
+    return header + body
+
+def decode_payload(data):
+    """Return the original payload bytes of a cache file, whether encoded or a legacy plain file."""
+    if not is_encoded(data):
+        return data
+
+    version, codec_id = data[len(CACHE_MAGIC)], data[len(CACHE_MAGIC)+1]
+    if version > CACHE_FORMAT_VERSION:
+        raise ValueError(f"Cache file format version {version} is newer than supported ({CACHE_FORMAT_VERSION})")
+
+    body = data[HEADER_LENGTH:]
+    codec = CODEC_NAMES.get(codec_id, 'unknown')
+    if codec == 'gzip':
+        return gzip.decompress(body)
+    elif codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(body)
+    elif codec is None:
+        return body
+    else:
+        raise ValueError(f"Unknown cache codec id: {codec_id}")
+
+def is_encoded(data):
+    return data[:len(CACHE_MAGIC)] == CACHE_MAGIC
+
+class _GzipPayloadStream(gzip.GzipFile):
+    """A gzip reader over the rest of an open cache file, closing the file along with itself."""
+    def __init__(self, cache_file):
+        super().__init__(fileobj=cache_file, mode='rb')
+        self._cache_file = cache_file
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._cache_file.close()
+
+def open_payload(path):
+    """Open a cache file as a binary stream of its decoded payload, decompressing as it's read."""
+    cache_file = open(path, 'rb')
+    header = cache_file.read(HEADER_LENGTH)
+    if not is_encoded(header):
+        cache_file.seek(0)
+        return cache_file
+
+    version, codec_id = header[len(CACHE_MAGIC)], header[len(CACHE_MAGIC)+1]
+    if version > CACHE_FORMAT_VERSION:
+        cache_file.close()
+        raise ValueError(f"Cache file format version {version} is newer than supported ({CACHE_FORMAT_VERSION})")
+
+    codec = CODEC_NAMES.get(codec_id, 'unknown')
+    if codec == 'gzip':
+        return _GzipPayloadStream(cache_file)
+    elif codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(cache_file, closefd=True)
+    elif codec is None:
+        return cache_file
+    else:
+        cache_file.close()
+        raise ValueError(f"Unknown cache codec id: {codec_id}")
+
+class ResponseCache:
+    """
+    On-disk store for API responses, one file per cache key, with an SQLite index.
+
+    The index records when each entry was fetched, its TTL, size, validators, payload
+    digest and hit count, so freshness checks and eviction never have to stat the files.
+    The digest only changes when different content is written, not when an entry is
+    revalidated, so it identifies the version of the payload.
+    """
+    def __init__(self, cache_dir, max_bytes=CACHE_MAX_BYTES, encoding=CACHE_ENCODING):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.encoding = encoding
+        self.index_path = os.path.join(cache_dir, INDEX_FILENAME)
+
+        # Opened on first use so that constructing the cache has no side effects
+        self._db = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        if self._db is not None:
+            return self._db
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        db = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL,
+                ttl REAL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                digest TEXT,
+                hits INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL
+            )
+        """)
+        db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+        # Upgrade indexes created before validators were stored
+        columns = [row['name'] for row in db.execute("PRAGMA table_info(entries)")]
+        if 'last_modified' not in columns:
+            db.execute("ALTER TABLE entries ADD COLUMN last_modified TEXT")
+        if 'digest' not in columns:
+            db.execute("ALTER TABLE entries ADD COLUMN digest TEXT")
+        self._db = db
+        return db
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """Return the index entry for key as a dict, or None if it isn't cached."""
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                return dict(row)
+
+            # Adopt files written before the index existed, once
+            path = self.path(key)
+            if not os.path.exists(path):
+                return None
+            mtime = os.path.getmtime(path)
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, fetched_at, ttl, size, last_access) VALUES (?, ?, NULL, ?, ?)",
+                (key, mtime, os.path.getsize(path), mtime)
+            )
+            return self.get(key)
+
+    def age(self, entry):
+        return time.time() - entry['fetched_at']
+
+    def is_expired(self, entry):
+        return entry['ttl'] is not None and self.age(entry) > entry['ttl']
+
+    def _record_hit(self, key):
+        with self._lock:
+            self._connect().execute(
+                "UPDATE entries SET hits = hits + 1, last_access = ? WHERE key = ?",
+                (time.time(), key)
+            )
+
+    def read(self, key):
+        """Read the decoded payload bytes for key and count it as a hit. None if its file is gone."""
+        try:
+            with open(self.path(key), 'rb') as cache_file:
+                payload = decode_payload(cache_file.read())
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+
+        self._record_hit(key)
+        return payload
+
+    def store_digest(self, key, payload):
+        """Record the digest of an entry adopted or written before digests were stored, and return it."""
+        digest = hashlib.sha1(payload).hexdigest()
+        with self._lock:
+            self._connect().execute("UPDATE entries SET digest = ? WHERE key = ? AND digest IS NULL", (digest, key))
+        return digest
+
+    def open(self, key):
+        """Open the decoded payload for key as a binary stream and count it as a hit. None if its file is gone."""
+        try:
+            stream = open_payload(self.path(key))
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+        self._record_hit(key)
+        return stream
+
+    def _forget(self, key):
+        # The file was deleted, or evicted by another process since its entry was read
+        with self._lock:
+            self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def write(self, key, payload, ttl=None, etag=None, last_modified=None):
+        """
+        Store payload bytes under key, along with its HTTP validators. A ttl of None never expires.
+        Returns the payload's digest.
+        """
+        data = encode_payload(payload, self.encoding)
+        digest = hashlib.sha1(payload).hexdigest()
+        # Written to a temporary file and renamed, so other processes never read a partial file
+        atomic_write(self.path(key), data)
+
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO entries (key, fetched_at, ttl, size, etag, last_modified, digest, hits, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE((SELECT hits FROM entries WHERE key = ?), 0), ?)",
+                (key, now, ttl, len(data), etag, last_modified, digest, key, now)
+            )
+        self.evict()
+        return digest
+
+    def touch(self, key, ttl=None):
+        """Mark an entry as freshly fetched without rewriting it, e.g. after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "UPDATE entries SET fetched_at = ?, ttl = ?, last_access = ? WHERE key = ?",
+                (now, ttl, now, key)
+            )
+
+    def validators(self, entry):
+        """Conditional request headers for revalidating a cached entry."""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def remove(self, key):
+        with self._lock:
+            self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def total_size(self):
+        with self._lock:
+            return self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        """Drop entries until the cache fits in max_bytes: expired entries first, then least recently used."""
+        with self._lock:
+            db = self._connect()
+            total = self.total_size()
+            if total <= self.max_bytes:
+                return
+
+            now = time.time()
+            rows = db.execute(
+                "SELECT key, size FROM entries "
+                "ORDER BY (ttl IS NOT NULL AND fetched_at + ttl < ?) DESC, last_access ASC",
+                (now,)
+            ).fetchall()
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                self.remove(row['key'])
+                total -= row['size']
+
+    def migrate(self):
+        """
+        Upgrade cache files to the current encoding. Legacy indent=2 JSON files are
+        re-serialized compactly. Entries keep their index metadata.
+
+        :return: The number of files rewritten.
+        """
+        migrated = 0
+        if not os.path.isdir(self.cache_dir):
+            return migrated
+
+        # Header that files already in the current format start with
+        current_header = encode_payload(b'', self.encoding)[:HEADER_LENGTH]
+
+        for filename in sorted(os.listdir(self.cache_dir)):
+            # Only response files, named METHOD_path.ext; derived caches like jump_distance.csv are left alone
+            if not filename.startswith(('GET_', 'POST_')) or not filename.endswith(('.json', '.csv')):
+                continue
+            path = self.path(filename)
+            with open(path, 'rb') as cache_file:
+                data = cache_file.read()
+
+            if data[:HEADER_LENGTH] == current_header:
+                continue
+
+            payload = decode_payload(data)
+            if filename.endswith('.json') and not is_encoded(data):
+                payload = json.dumps(json.loads(payload), separators=(',', ':')).encode('utf-8')
+
+            entry = self.get(filename)
+            encoded = encode_payload(payload, self.encoding)
+            atomic_write(path, encoded)
+            with self._lock:
+                self._connect().execute("UPDATE entries SET size = ? WHERE key = ?", (len(encoded), entry['key']))
+            migrated += 1
+
+        return migrated
+
+if __name__ == "__main__":
+    # python -m prunpy.cache migrate [cache_dir]
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print("Usage: python -m prunpy.cache migrate [cache_dir]")
+        sys.exit(1)
+    cache_dir = sys.argv[2] if len(sys.argv) > 2 else './cache'
+    count = ResponseCache(cache_dir).migrate()
+    print(f"Migrated {count} cache files in {cache_dir}")
@@ -1,192 +1,569 @@
 from prunpy.api import fio
 from prunpy.constants import DEFAULT_BUILDING_PLANET_NATURAL_ID, DEMOGRAPHICS
+from prunpy.planet_store import PlanetStore, PLANET_FULL_REQUEST
 import os
+import re
+import time
+import json
+import fnmatch
+import inspect
+import functools
+import threading
+
+# Requests behind the raw datasets, shared by the loader properties and prefetch()
+RAW_DATASET_REQUESTS = {
+    'allplanets': PLANET_FULL_REQUEST,
+    'materials_raw': {'method': 'GET', 'endpoint': '/material/allmaterials', 'cache': 60*60*24},
+    'allbuildings_raw': {'method': 'GET', 'endpoint': '/building/allbuildings', 'cache': -1},
+    'rawexchangedata': {'method': 'GET', 'endpoint': '/exchange/full', 'message': "Fetching exchange data..."},
+    'rawexchanges': {'method': 'GET', 'endpoint': '/exchange/station', 'cache': 'forever'},
+    'rawsystemstars': {'method': 'GET', 'endpoint': '/systemstars', 'cache': 60*60*24},
+}
+EXCHANGE_HISTORY_REQUEST = {'method': 'GET', 'endpoint': '/exchange/cxpc/full', 'cache': 60*60*24}
+
+# Every request prefetch() can batch: the raw datasets, plus responses that are indexed
+# by a loader method (or, for system_links, by prunpy.models.pathfinding) when first used
+DATASET_REQUESTS = {
+    **RAW_DATASET_REQUESTS,
+    'exchange_history': EXCHANGE_HISTORY_REQUEST,
+    'population_reports': {'method': 'GET', 'endpoint': '/csv/infrastructure/allreports', 'cache': 60*60*24},
+    'workforce_needs': {'method': 'GET', 'endpoint': '/global/workforceneeds', 'cache': 60*60*24},
+    'system_links': {'method': 'GET', 'endpoint': '/csv/systemlinks', 'response_format': 'csv', 'cache': True},
+}
+
+# Loader cache key a dataset ends up under, where it isn't the dataset's own name
+DATASET_LOADER_KEYS = {
+    'allplanets': 'planet_lookup',
+    'exchange_history': 'get_all_exchange_price_history',
+    'population_reports': 'all_population_reports',
+    'workforce_needs': 'population_upkeep',
+}
+
+# Datasets large enough to be streamed record by record into their indexes
+# instead of parsed into a list first
+STREAMED_DATASETS = ['allplanets', 'exchange_history', 'population_reports']
+
+# Names prefetch() accepts, and the datasets each one needs
+PREFETCH_GROUPS = {
+    'planets': ['allplanets', 'materials_raw', 'rawsystemstars'],
+    'systems': ['rawsystemstars', 'allplanets'],
+    'materials': ['materials_raw'],
+    'buildings': ['allbuildings_raw', 'allplanets', 'materials_raw'],
+    'recipes': ['allbuildings_raw', 'allplanets', 'materials_raw'],
+    'exchanges': ['rawexchanges', 'rawexchangedata'],
+    'exchange_goods': ['rawexchanges', 'rawexchangedata'],
+    'price_history': ['exchange_history', 'rawexchanges', 'rawexchangedata'],
+    'population_reports': ['population_reports'],
+    'population': ['population_reports', 'workforce_needs', 'allplanets'],
+    'jump_distances': ['system_links', 'rawexchanges'],
+}
+
+# What warm_up() fetches: the datasets most scripts need
+WARM_UP_DATASETS = ['planets', 'materials', 'buildings', 'exchange_goods', 'price_history']
+
+# Volatile data the loader only keeps for ttl seconds. Each group is its root datasets
+# plus every dataset built from them (see DATASET_GRAPH), which expire and are refreshed
+# together. Anything else is static game data (materials, buildings, planets, recipes)
+# and is kept until the process exits.
+LOADER_CACHE_GROUPS = {
+    'exchange': {'ttl': 15*60, 'roots': ['rawexchangedata']},
+    'price_history': {'ttl': 60*60*24, 'roots': ['get_all_exchange_price_history']},
+    'population': {'ttl': 60*60*24, 'roots': ['all_population_reports']},
+}
+
+# 'full' downloads every planet (cached for an hour); 'incremental' keeps a local planet store
+# and only refetches planets that are new, renamed or due for a check. Other changes to a planet
+# can then take up to PLANET_RECORD_MAX_AGE (a week) to show up (see prunpy.planet_store)
+PLANET_SYNC_MODE = os.environ.get('PRUNPY_PLANET_SYNC', 'full')
+
+# With PRUNPY_SNAPSHOT=1, the loader starts from the snapshot made by `python -m prunpy snapshot build`
+# (see prunpy.snapshot) the first time it needs anything, instead of building everything from raw data
+SNAPSHOT_AUTOLOAD = os.environ.get('PRUNPY_SNAPSHOT', '') not in ['', '0']
+
+_MISSING = object()
+
+# Datasets cached per planet, which sync_planets() drops planet by planet
+PER_PLANET_DATASETS = ['planet_instance_*', 'all_buildings_*', 'building_state_*_*']
+
+# Every memoized loader dataset, named by its key template with arguments as '*'
+# (e.g. 'all_buildings_*'), mapped to the datasets it's built from. Filled in by @memoized.
+DATASET_GRAPH = {}
+
+def dataset_node(key_template):
+    """The DATASET_GRAPH name for a key template, e.g. 'all_buildings_{planet_id}' -> 'all_buildings_*'."""
+    return re.sub(r'\{[^}]*\}', '*', key_template)
+
+def builds_on(dependency, node):
+    """Whether a depends_on entry covers a node or cache key, e.g. 'planet_instance_*' covers 'planet_instance_OT-580b'."""
+    return dependency == node or fnmatch.fnmatchcase(node, dependency) or fnmatch.fnmatchcase(dependency, node)
+
+def memoized(key_template, depends_on=()):
+    """
+    Cache a loader method's result under key_template, formatted with the method's
+    arguments, e.g. @memoized('all_buildings_{planet_id}'). See DataLoader._memoize.
+
+    :param depends_on: The DATASET_GRAPH nodes the result is built from, so that it's
+                       dropped whenever one of them is refreshed. Results built from one
+                       cache key of a node can name that key instead, e.g. 'all_buildings_CB-045b'.
+    """
+    DATASET_GRAPH[dataset_node(key_template)] = list(depends_on)
+
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if '{' in key_template:
+                arguments = signature.bind(self, *args, **kwargs)
+                arguments.apply_defaults()
+                key = key_template.format(**arguments.arguments)
+            else:
+                key = key_template
+            return self._memoize(key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
 
 class DataLoader:
     def __init__(self):
         self._cache = {}
         self.planet_dicts = {}
+        self.planet_sync_mode = PLANET_SYNC_MODE
+        self.planet_store = PlanetStore()
+
+        # One lock per cache key, held while its value is built
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+
+        # When each of LOADER_CACHE_GROUPS was first loaded since its last refresh
+        self._group_loaded_at = {}
+        self._key_nodes = {}
+
+        # Build time per DATASET_GRAPH node, see build_timings()
+        self._build_timings = {}
+        self._build_timings_lock = threading.Lock()
+        self._build_stack = threading.local()
+
+        self._snapshot_pending = SNAPSHOT_AUTOLOAD
 
     def _get_cached_data(self, key):
         """Retrieve data from cache if available."""
+        self._expire(key)
         return self._cache.get(key)
 
     def _set_cache(self, key, data):
         """Store data in cache."""
+        group = self._cache_group(key)
+        if group is not None:
+            self._group_loaded_at.setdefault(group, time.time())
         self._cache[key] = data
         return data
 
+    def _dataset_node(self, key):
+        """The DATASET_GRAPH node a cache key belongs to, or None for keys outside the graph."""
+        if key in DATASET_GRAPH:
+            return key
+        return next((node for node in DATASET_GRAPH if '*' in node and fnmatch.fnmatchcase(key, node)), None)
+
+    def dependents(self, nodes, stop_at=()):
+        """
+        Every DATASET_GRAPH node built, directly or not, from any of nodes (or cache keys).
+
+        :param stop_at: Nodes left out, along with whatever is only reachable through them.
+        """
+        dependents = set()
+        pending = list(nodes)
+        while pending:
+            node = pending.pop()
+            for dependent, dependencies in DATASET_GRAPH.items():
+                if dependent not in dependents and dependent not in stop_at \
+                and any(builds_on(dependency, node) for dependency in dependencies):
+                    dependents.add(dependent)
+                    pending.append(dependent)
+        return dependents
+
+    def dependencies(self, nodes):
+        """Every DATASET_GRAPH node that any of nodes is built from, directly or not."""
+        dependencies = set()
+        pending = list(nodes)
+        while pending:
+            for dependency in DATASET_GRAPH.get(pending.pop(), []):
+                # e.g. all_buildings_CB-045b -> all_buildings_*
+                dependency = self._dataset_node(dependency) or dependency
+                if dependency not in dependencies:
+                    dependencies.add(dependency)
+                    pending.append(dependency)
+        return dependencies
+
+    def _cache_group(self, key):
+        """The LOADER_CACHE_GROUPS entry key belongs to, or None for static data."""
+        # Looked up on every cache hit, so the graph is only searched once per key
+        if key not in self._key_nodes:
+            node = self._dataset_node(key)
+            self._key_nodes[key] = next((group for group, settings in LOADER_CACHE_GROUPS.items()
+                                         if node in settings['roots'] or node in self.dependents(settings['roots'])), None)
+        return self._key_nodes[key]
+
+    def _expire(self, key):
+        """Refresh key's group if it has outlived its ttl."""
+        group = self._cache_group(key)
+        loaded_at = self._group_loaded_at.get(group)
+        if loaded_at is not None and time.time() - loaded_at > LOADER_CACHE_GROUPS[group]['ttl']:
+            self.refresh(group)
+
+    def refresh(self, *names):
+        """
+        Drop cached data, and everything built from it, so that it's loaded again on next use,
+        e.g. loader.refresh('exchange') for new exchange prices. Nothing else is dropped.
+
+        :param names: Groups from LOADER_CACHE_GROUPS, or cache keys and DATASET_GRAPH nodes
+                      (fnmatch patterns allowed), e.g. 'materials_raw' or 'all_buildings_*'.
+                      Refreshes every group if none are given.
+        :return: The cache keys dropped.
+        """
+        patterns, nodes = [], set()
+        for name in names or LOADER_CACHE_GROUPS:
+            if name in LOADER_CACHE_GROUPS:
+                nodes.update(LOADER_CACHE_GROUPS[name]['roots'])
+                self._group_loaded_at.pop(name, None)
+            else:
+                patterns.append(name)
+                nodes.update(node for node in DATASET_GRAPH if fnmatch.fnmatchcase(node, name))
+
+        with self._key_locks_lock:
+            matched = [key for key in self._cache if any(fnmatch.fnmatchcase(key, pattern) for pattern in patterns)]
+            nodes.update(self._dataset_node(key) for key in matched)
+            # Only the named keys themselves, e.g. refreshing exchange_NC1 leaves exchange_CI1 alone
+            stale_nodes = self.dependents(nodes) | (nodes - {self._dataset_node(key) for key in matched})
+            dropped = matched + [key for key in self._cache if key not in matched and self._dataset_node(key) in stale_nodes]
+            for key in dropped:
+                del self._cache[key]
+        return dropped
+
+    def _memoize(self, key, build):
+        """
+        Return the cached value for key, building and caching it first if needed.
+        Safe to call from several threads: one builds while the others wait for its result.
+        If the build raises, nothing is cached and the next caller tries again.
+        Volatile data is rebuilt once its group's ttl has passed (see LOADER_CACHE_GROUPS).
+        """
+        self._expire(key)
+        if (cached_data := self._cache.get(key, _MISSING)) is not _MISSING: return cached_data
+
+        if self._snapshot_pending:
+            self._snapshot_pending = False
+            self.load_snapshot()
+            if (cached_data := self._cache.get(key, _MISSING)) is not _MISSING: return cached_data
+
+        with self._key_locks_lock:
+            key_lock = self._key_locks.setdefault(key, threading.RLock())
+
+        # Builds only wait on the keys they depend on, so threads can't deadlock unless the dependencies are circular
+        with key_lock:
+            if (cached_data := self._cache.get(key, _MISSING)) is not _MISSING: return cached_data
+            return self._set_cache(key, self._timed_build(key, build))
+
+    def _timed_build(self, key, build):
+        """Run build, adding its time to build_timings() under key's dataset node."""
+        # Time spent building dependencies is counted for them, and subtracted from this build's own time
+        stack = self._build_stack.__dict__.setdefault('child_times', [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return build()
+        finally:
+            elapsed = time.perf_counter() - start
+            own = elapsed - stack.pop()
+            if stack:
+                stack[-1] += elapsed
+
+            node = self._dataset_node(key) or key
+            with self._build_timings_lock:
+                timing = self._build_timings.setdefault(node, {'builds': 0, 'total': 0.0, 'own': 0.0, 'max': 0.0})
+                timing['builds'] += 1
+                timing['total'] += elapsed
+                timing['own'] += own
+                timing['max'] = max(timing['max'], elapsed)
+
+    def load_snapshot(self, path=None):
+        """
+        Fill the cache from a snapshot made by `python -m prunpy snapshot build`, skipping
+        anything built from data that has changed since. See prunpy.snapshot.
+
+        :return: The cache keys loaded.
+        """
+        from prunpy import snapshot
+        return snapshot.load(self, path or snapshot.SNAPSHOT_FILE)
+
+    def build_timings(self):
+        """
+        Seconds spent building each dataset node, slowest first: 'total' includes building the
+        datasets it depends on, 'own' doesn't. Failed builds are counted too.
+        """
+        with self._build_timings_lock:
+            timings = {node: dict(timing) for node, timing in self._build_timings.items()}
+        return dict(sorted(timings.items(), key=lambda item: item[1]['own'], reverse=True))
+
+    def dump_build_timings(self, path):
+        with open(path, 'w') as timings_file:
+            json.dump(self.build_timings(), timings_file, indent=2)
+
     @property
+    @memoized('allplanets', depends_on=['planet_lookup'])
     def allplanets(self):
-        cache_key = 'allplanets'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        allplanets = fio.request("GET", f"/planet/allplanets/full")
-        return self._set_cache(cache_key, allplanets)
+        # Shares its dicts with planet_lookup, which the response is streamed into
+        allplanets = list(self.planet_lookup.values())
+        return allplanets
 
     @property
+    @memoized('planet_lookup')
     def planet_lookup(self):
-        cache_key = 'planet_lookup'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        planet_lookup = {planet['PlanetNaturalId']: planet for planet in self.allplanets}
-        return self._set_cache(cache_key, planet_lookup)
+        if self.planet_sync_mode == 'incremental':
+            self.planet_store.sync()
+            return dict(self.planet_store.planets)
+
+        planet_records = fio.request(**RAW_DATASET_REQUESTS['allplanets'], lazy=True)
+        planet_lookup = {planet['PlanetNaturalId']: planet for planet in planet_records}
+        return planet_lookup
+
+    def sync_planets(self):
+        """
+        Update planet data through the incremental planet store. Only what was built from the
+        changed planets is dropped: their Planets and buildings and what was built from those.
+        Datasets over every planet are rebuilt when the change affects them.
+
+        :return: The natural ids of planets added, changed or removed.
+        """
+        changed = self.planet_store.sync()
+        if not changed:
+            return changed
+
+        with self._key_locks_lock:
+            planet_lookup = self._cache.get('planet_lookup')
+            if planet_lookup is None:
+                return changed
+
+            old_names = {planet_lookup[natural_id]['PlanetName'] for natural_id in changed if natural_id in planet_lookup}
+            # Planets added, removed or renamed change the lists and indexes of planets, not just their records
+            listing_changed = False
+            for natural_id in changed:
+                record = self.planet_store.planets.get(natural_id)
+                old_record = planet_lookup.get(natural_id)
+                if record is None or old_record is None or record.get('PlanetName') != old_record.get('PlanetName'):
+                    listing_changed = True
+                if record is not None:
+                    planet_lookup[natural_id] = record
+                else:
+                    planet_lookup.pop(natural_id, None)
+
+            # Each planet's Planet, buildings and extractor states are keyed by the planet,
+            # so other planets' are kept while what was built from these goes with them
+            stale = []
+            for natural_id in changed:
+                stale += [f"planet_instance_{natural_id}", f"building_state_*_{natural_id}"]
+            for planet in set(changed) | old_names:
+                stale.append(f"all_buildings_{planet}")
+            matched = [key for key in self._cache if any(fnmatch.fnmatchcase(key, pattern) for pattern in stale)]
+            stale_nodes = self.dependents(matched, stop_at=PER_PLANET_DATASETS)
+            for key in matched + [key for key in self._cache if key not in matched and self._dataset_node(key) in stale_nodes]:
+                del self._cache[key]
+
+            # Built from every record, but nothing built from them depends on the changed fields
+            old_factor_ranges = self._cache.pop('factor_ranges', None)
+            for cache_key in ['allplanets', 'planet_table']:
+                self._cache.pop(cache_key, None)
+
+        if listing_changed:
+            self.refresh('allplanets', 'planet_index')
+        # Every Planet holds the factor ranges, so they're only rebuilt when the ranges move
+        if old_factor_ranges is not None and self.factor_ranges != old_factor_ranges:
+            self.refresh('planet_instance_*')
+
+        return changed
 
     @property
+    @memoized('system_planet_lookup', depends_on=['allplanets'])
     def system_planet_lookup(self):
-        cache_key = 'system_planet_lookup'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         system_planet_lookup = {}
         for planet in self.allplanets:
             if planet['SystemId'] not in system_planet_lookup:
                 system_planet_lookup[planet['SystemId']] = []
             system_planet_lookup[planet['SystemId']].append(planet['PlanetName'])
-        return self._set_cache(cache_key, system_planet_lookup)
+        return system_planet_lookup
 
     @property
+    @memoized('rawsystemstars')
     def rawsystemstars(self):
-        cache_key = 'rawsystemstars'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        rawsystemstars = fio.request("GET", f"/systemstars")
-        return self._set_cache(cache_key, rawsystemstars)
+        rawsystemstars = fio.request(**RAW_DATASET_REQUESTS['rawsystemstars'])
+        return rawsystemstars
 
     @property
+    @memoized('systemstars_lookup', depends_on=['rawsystemstars'])
     def systemstars_lookup(self):
-        cache_key = 'systemstars_lookup'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         systemstars_lookup = {system["SystemId"]: system for system in self.rawsystemstars}
-        return self._set_cache(cache_key, systemstars_lookup)
+        return systemstars_lookup
 
     @property
+    @memoized('materials_raw')
     def materials_raw(self):
-        cache_key = 'materials_raw'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
+        materials_raw = fio.request(**RAW_DATASET_REQUESTS['materials_raw'])
+        return self._strip_uncraftable_materials(materials_raw)
 
-        materials_raw = fio.request("GET", "/material/allmaterials")
+    def _strip_uncraftable_materials(self, materials_raw):
         # Remove the entry with ticker "CMK", as it's not craftable
         # Note: This will break things when reading ships of new players
-        for i in range(len(materials_raw)):
-            if materials_raw[i]['Ticker'] == 'CMK':
-                del materials_raw[i]
-                break
-        return self._set_cache(cache_key, materials_raw)
+        # Returns a new list, since fio may hand the same parsed response to other callers
+        return [material for material in materials_raw if material['Ticker'] != 'CMK']
 
     @property
+    @memoized('materials_by_ticker', depends_on=['materials_raw'])
     def materials_by_ticker(self):
         from prunpy.models.material import Material
-        cache_key = 'materials_by_ticker'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         materials_by_ticker = {rawmaterial['Ticker']: Material(rawmaterial) for rawmaterial in self.materials_raw}
-        return self._set_cache(cache_key, materials_by_ticker)
+        return materials_by_ticker
 
     @property
     def materials(self):
         return self.materials_by_ticker
 
     @property
+    @memoized('material_by_hash', depends_on=['materials_raw'])
     def materials_by_hash(self):
         from prunpy.models.material import Material
-        cache_key = 'material_by_hash'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         materials_by_hash = {material['MaterialId']: Material(material) for material in self.materials_raw}
-        return self._set_cache(cache_key, materials_by_hash)
+        return materials_by_hash
 
     @property
+    @memoized('material_ticker_list', depends_on=['materials_by_ticker'])
     def material_ticker_list(self):
-        cache_key = 'material_ticker_list'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        return self._set_cache(cache_key, sorted(self.materials_by_ticker.keys()))
+        return sorted(self.materials_by_ticker.keys())
 
+    @memoized('get_material_{ticker}', depends_on=['materials_by_ticker'])
     def get_material(self, ticker):
-        cache_key = 'get_material_' + str(ticker)
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         if ticker not in self.materials_by_ticker:
             raise ValueError(f"Material with ticker {ticker} not found")
 
         material = self.materials_by_ticker[ticker]
-        return self._set_cache(cache_key, material)
+        return material
 
     def material(self, ticker):
         return self.get_material(ticker)
 
     @property
+    @memoized('allbuildings_raw')
     def allbuildings_raw(self):
-        cache_key = 'allbuildings_raw'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
+        allbuildings_raw = fio.request(**RAW_DATASET_REQUESTS['allbuildings_raw'])
+        return allbuildings_raw
 
-        allbuildings_raw = fio.request("GET", f"/building/allbuildings", cache=-1)
-        return self._set_cache(cache_key, allbuildings_raw)
+    @property
+    @memoized('allbuildings_by_ticker', depends_on=['allbuildings_raw'])
+    def allbuildings_by_ticker(self):
+        return {building['Ticker']: building for building in self.allbuildings_raw}
 
     @property
+    @memoized('all_building_tickers', depends_on=['allbuildings_raw'])
     def all_building_tickers(self):
-        cache_key = 'all_building_tickers'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        return self._set_cache(cache_key, [building['Ticker'] for building in self.allbuildings_raw])
+        return [building['Ticker'] for building in self.allbuildings_raw]
 
     @property
+    @memoized('rawexchangedata')
     def rawexchangedata(self):
-        cache_key = 'rawexchangedata'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        rawexchangedata = fio.request("GET", f"/exchange/full", message="Fetching exchange data...")
-        return self._set_cache(cache_key, rawexchangedata)
+        rawexchangedata = fio.request(**RAW_DATASET_REQUESTS['rawexchangedata'])
+        return rawexchangedata
 
     @property
+    @memoized('rawexchanges')
     def rawexchanges(self):
-        cache_key = 'rawexchanges'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        rawexchanges = fio.request("GET", "/exchange/station", cache='forever')
-        return self._set_cache(cache_key, rawexchanges)
+        rawexchanges = fio.request(**RAW_DATASET_REQUESTS['rawexchanges'])
+        return rawexchanges
 
+    @memoized('get_all_exchange_price_history', depends_on=['rawexchanges'])
     def get_all_exchange_price_history(self):
-        cache_key = f'get_all_exchange_price_history'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         print("Fetching exchange price history...", end="")
-        allhistory = fio.request("GET", f"/exchange/cxpc/full", cache=60*60*24)
-
-        exchanges_history = {code: {} for code in self.exchanges.keys()}
-        for history in allhistory:
-            exchanges_history[history['ExchangeCode']][history['MaterialTicker']] = history
-
+        history_records = fio.request(**EXCHANGE_HISTORY_REQUEST, lazy=True)
+        exchanges_history = self._index_exchange_price_history(history_records)
         print("done")
 
-        return self._set_cache(cache_key, exchanges_history)
+        return exchanges_history
 
+    def _index_exchange_price_history(self, history_records):
+        exchanges_history = {rawexchange['ComexCode']: {} for rawexchange in self.rawexchanges}
+        for history in history_records:
+            exchanges_history[history['ExchangeCode']][history['MaterialTicker']] = history
+        return exchanges_history
+
+    def prefetch(self, datasets):
+        """
+        Fetch everything the named datasets depend on concurrently, so that a script's
+        compute phase doesn't block on one request after another.
+
+        Streamed datasets are only downloaded into the response cache here; they're parsed
+        into their indexes on first use. The rest are parsed once and kept by the loader
+        (raw datasets) or in fio's memo.
+
+        :param datasets: Names from PREFETCH_GROUPS or DATASET_REQUESTS, e.g. {'planets', 'price_history'}.
+        :return: {'fetched': [...], 'cached': [...], 'loaded': [...]}, the datasets downloaded,
+                 read from the response cache, or already held by the loader.
+        """
+        keys = []
+        for name in datasets:
+            if name in PREFETCH_GROUPS:
+                group = PREFETCH_GROUPS[name]
+            elif name in DATASET_REQUESTS:
+                group = [name]
+            else:
+                raise ValueError(f"Unknown dataset: {name}")
+            keys += [key for key in group if key not in keys]
+
+        report = {'fetched': [], 'cached': [], 'loaded': []}
+        pending = []
+        for key in keys:
+            # The planet store syncs itself, planet by planet, on first use
+            if key == 'allplanets' and self.planet_sync_mode == 'incremental':
+                continue
+            if self._get_cached_data(DATASET_LOADER_KEYS.get(key, key)) is not None:
+                report['loaded'].append(key)
+                continue
+            report['cached' if fio.is_cached(**DATASET_REQUESTS[key]) else 'fetched'].append(key)
+            pending.append(key)
+
+        results = fio.request_many([{**DATASET_REQUESTS[key], 'lazy': key in STREAMED_DATASETS} for key in pending])
+
+        for key, result in zip(pending, results):
+            if key in STREAMED_DATASETS:
+                continue  # Left unconsumed; the response is in the cache for the property that streams it
+            if key == 'materials_raw':
+                result = self._strip_uncraftable_materials(result)
+            if key in RAW_DATASET_REQUESTS:
+                self._set_cache(key, result)
+
+        return report
+
+    def warm_up(self):
+        """
+        Fetch the raw datasets most scripts need concurrently instead of one after another.
+        Datasets already loaded are skipped.
+        """
+        return self.prefetch(WARM_UP_DATASETS)
+
+    @memoized('get_raw_exchange_price_history_{exchange_ticker}.{material_ticker}', depends_on=['get_all_exchange_price_history'])
     def get_raw_exchange_price_history(self, exchange_ticker, material_ticker):
-        cache_key = f'get_raw_exchange_price_history_{exchange_ticker}.{material_ticker}'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         history = self.get_all_exchange_price_history()[exchange_ticker][material_ticker]['Entries']
 
         #history = fio.request("GET", f"/exchange/cxpc/{material_ticker}.{exchange_ticker}", cache=60*60*24*3)
         
-        return self._set_cache(cache_key, history)
+        return history
 
+    @memoized('get_price_history_{exchange_ticker}.{material_ticker}', depends_on=['get_raw_exchange_price_history_*.*'])
     def get_price_history(self, exchange_ticker, material_ticker):
-        cache_key = f'get_price_history_{exchange_ticker}.{material_ticker}'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         from prunpy.models.price_history import PriceHistory
         history = PriceHistory(material_ticker, exchange_ticker)
         
-        return self._set_cache(cache_key, history)
+        return history
 
     @property
+    @memoized('all_population_reports')
     def all_population_reports(self):
-        cache_key = 'all_population_reports'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        all_population_reports_raw = fio.request("GET", "/csv/infrastructure/allreports", cache=60*60*24)
+        all_population_reports_raw = fio.request(**DATASET_REQUESTS['population_reports'], lazy=True)
         all_population_reports = {}
         for report in all_population_reports_raw:
             planet_id = report["PlanetNaturalId"]
@@ -194,7 +571,7 @@ class DataLoader:
             if planet_id not in all_population_reports:
                 all_population_reports[planet_id] = []
             all_population_reports[planet_id].append(report)
-        return self._set_cache(cache_key, all_population_reports)
+        return all_population_reports
 
 
     ##### Methods that depend on external classes which depend on loader
@@ -202,162 +579,164 @@ class DataLoader:
     ##### Generally they are methods, not properties
     ##### Also includes getters that depend on methods that require imports
 
+    @memoized('all_planets_by_{key}', depends_on=['allplanets'])
     def get_all_planets(self, key='name'):
-        from prunpy.models.planet import Planet
-        cache_key = f"all_planets_by_{key}"
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        planets = {}
-        total = len(loader.allplanets)
-        for i, planet in enumerate(loader.allplanets):
-            planet_instance = Planet(natural_id=planet.get('PlanetNaturalId'))
-
-            if key in ['name', '', 'PlanetName']:
-                planets[planet_instance.name] = planet_instance
-            elif key in ['natural_id', 'id', 'PlanetNaturalId']:
-                planets[planet_instance.natural_id] = planet_instance
-            else:
-                raise ValueError(f"Invalid key: {key}")
-
-            #print(f"\rLoading all planets: {i+1}/{total}", end="")
-        #print("\n")
+        """
+        Every planet, by name or natural id. Planets are only built when first accessed,
+        and are the same instances whichever key they're accessed by.
+        """
+        from prunpy.models.planet import LazyPlanetMap
+        if key in ['name', '', 'PlanetName']:
+            natural_ids = {planet.get('PlanetName'): planet['PlanetNaturalId'] for planet in self.allplanets}
+        elif key in ['natural_id', 'id', 'PlanetNaturalId']:
+            natural_ids = {planet['PlanetNaturalId']: planet['PlanetNaturalId'] for planet in self.allplanets}
+        else:
+            raise ValueError(f"Invalid key: {key}")
 
-        factor_ranges = {}
-        # Determine range of factors for all resources
-        for name, planet in planets.items():
-            for ticker, resource in planet.resources.items():
-                if ticker not in factor_ranges:
-                    factor_ranges[ticker] = (resource['factor'],resource['factor'])
-                else:
-                    if resource['factor'] < factor_ranges[ticker][0]:
-                        factor_ranges[ticker] = (resource['factor'],factor_ranges[ticker][1])
-                    if resource['factor'] > factor_ranges[ticker][1]:
-                        factor_ranges[ticker] = (factor_ranges[ticker][0],resource['factor'])
+        return LazyPlanetMap(natural_ids, self.get_planet_instance)
 
-        for name, planet in planets.items():
-            for ticker, resource in planet.resources.items():
-                resource['factor_range'] = factor_ranges[ticker]
+    @memoized('planet_instance_{natural_id}', depends_on=['planet_lookup', 'material_by_hash', 'factor_ranges'])
+    def get_planet_instance(self, natural_id):
+        from prunpy.models.planet import Planet
+        return Planet(natural_id=natural_id)
 
-        return self._set_cache(cache_key, planets)
+    @property
+    @memoized('factor_ranges', depends_on=['planet_lookup', 'materials_raw'])
+    def factor_ranges(self):
+        """{ticker: (lowest, highest)} resource factor over every planet, from the raw planet data."""
+        import numpy as np
+
+        material_ids, factors = [], []
+        for planet in self.planet_lookup.values():
+            for resource in planet.get('Resources', []):
+                material_ids.append(resource.get('MaterialId'))
+                factors.append(resource.get('Factor', 0))
+        if not factors:
+            return {}
+
+        unique_ids, material_index = np.unique(np.array(material_ids), return_inverse=True)
+        factors = np.array(factors, dtype=float)
+        lowest = np.full(len(unique_ids), np.inf)
+        highest = np.full(len(unique_ids), -np.inf)
+        np.minimum.at(lowest, material_index, factors)
+        np.maximum.at(highest, material_index, factors)
+
+        tickers = {material['MaterialId']: material['Ticker'] for material in self.materials_raw}
+        return {tickers[material_id]: (float(low), float(high))
+                for material_id, low, high in zip(unique_ids.tolist(), lowest, highest) if material_id in tickers}
 
     @property
     def planets(self):
         return self.get_all_planets()
 
+    @memoized('get_all_planet_names', depends_on=['all_planets_by_*'])
     def get_all_planet_names(self):
-        cache_key = 'get_all_planet_names'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         names = list(self.get_all_planets('name').keys())
 
-        return self._set_cache(cache_key, names)
+        return names
 
+    @memoized('get_all_planet_ids', depends_on=['allplanets'])
     def get_all_planet_ids(self):
-        cache_key = 'get_all_planet_ids'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         ids = []
         for planet in loader.allplanets:
             ids.append(planet['PlanetNaturalId'])
 
-        return self._set_cache(cache_key, ids)
+        return ids
+
+    @property
+    @memoized('planet_index', depends_on=['planet_lookup'])
+    def planet_index(self):
+        """Planets by name, natural id and system, with prefix and fuzzy search. See PlanetIndex."""
+        from prunpy.utils.planet_index import PlanetIndex
+        return PlanetIndex(self.planet_lookup.values())
+
+    @property
+    @memoized('planet_table', depends_on=['planet_lookup', 'materials_raw'])
+    def planet_table(self):
+        """Every planet's attributes as NumPy columns, for filtering and scoring all planets at once. See PlanetTable."""
+        from prunpy.models.planet_table import PlanetTable
+        return PlanetTable(self.planet_lookup.values(), self.materials_raw)
 
     def get_planet(self, name_string):
         from prunpy.models.planet import Planet
         if isinstance(name_string, Planet):
-            return self.get_all_planets(key='natural_id')[name_string.natural_id]
-        
-        planet_names = self.get_all_planet_names()
-        planet_ids   = self.get_all_planet_ids()
-
-        # Create lowercase mappings for case-insensitive lookup
-        lc_names = {name.lower(): name for name in planet_names}
-        lc_ids   = {planet_id.lower(): planet_id for planet_id in planet_ids}
-
-        # Lowercase the input for case-insensitive comparison
-        lc_name_string = name_string.lower()
-
-        if lc_name_string in lc_names:
-            original_name = lc_names[lc_name_string]
-            return self.get_all_planets(key='name')[original_name]
-        elif lc_name_string in lc_ids:
-            original_id = lc_ids[lc_name_string]
-            return self.get_all_planets(key='natural_id')[original_id]
-        else:
-            # Raise error
+            return self.get_planet_instance(name_string.natural_id)
+
+        # Case-insensitive, by name or natural id
+        natural_id = self.planet_index.resolve(name_string)
+        if natural_id is None:
             raise Exception(f"Could not find planet '{name_string}'")
+        return self.get_planet_instance(natural_id)
 
+    @memoized('systems', depends_on=['systemstars_lookup', 'system_planet_lookup'])
     def get_all_systems(self):
         from prunpy.models.system import System
-        cache_key = 'systems'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         systems = {}
         total = len(loader.systemstars_lookup)
         for system_hash in loader.systemstars_lookup.keys():
             system_class = System(system_hash)
             systems[system_class.name] = system_class
-        return self._set_cache(cache_key, systems)
+        return systems
 
+    @memoized('all_buildings_{planet_id}', depends_on=['all_building_tickers', 'building_state_*_*', 'planet_index', 'planet_instance_*'])
     def get_all_buildings(self, planet_id=DEFAULT_BUILDING_PLANET_NATURAL_ID):
         from prunpy.models.building import Building
         from prunpy.models.planet import Planet
-        cache_key = 'all_buildings_' + str(planet_id)
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         buildings = {}
-        for rawbuilding in loader.allbuildings_raw:
-            ticker = rawbuilding.get('Ticker')
-            planet = self.get_planet(planet_id)
+        planet = self.get_planet(planet_id)
+        for ticker in self.all_building_tickers:
             buildings[ticker] = Building(ticker, planet)
 
-        return self._set_cache(cache_key, buildings)
+        return buildings
 
     def get_building(self, ticker, planet_id=DEFAULT_BUILDING_PLANET_NATURAL_ID):
         building = self.get_all_buildings(planet_id).get(ticker)
         return building
 
+    @memoized('building_state_{ticker}_{environment_key}', depends_on=['allbuildings_by_ticker', 'planet_instance_*'])
+    def get_building_state(self, ticker, environment_key, planet):
+        """
+        What every Building of ticker on a planet with environment_key has in common,
+        built from the first such planet asked for. See building_environment_key.
+        """
+        from prunpy.models.building import build_shared_state
+        return build_shared_state(ticker, planet)
+
+    @memoized('all_exchanges', depends_on=['exchange_goods', 'rawexchanges'])
     def get_all_exchanges(self):
         from prunpy.models.exchange import Exchange
-        cache_key = 'all_exchanges'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         exchanges = {}
         exchange_goods = self.get_exchange_goods()
         for rawexchange in loader.rawexchanges:
             ticker = rawexchange['ComexCode']
             exchanges[ticker] = Exchange(rawexchange, exchange_goods[ticker])
-        return self._set_cache(cache_key, exchanges)
+        return exchanges
 
     @property
     def exchanges(self):
         return self.get_all_exchanges()
 
+    @memoized('exchange_{identifier}', depends_on=['all_exchanges'])
     def get_exchange(self, identifier):
         from prunpy.models.exchange import Exchange
 
-        cache_key = 'exchange_' + str(identifier)
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         if isinstance(identifier, Exchange):
-            return self._set_cache(cache_key, identifier)
+            return identifier
 
         exchanges = self.get_all_exchanges()
 
         if identifier in exchanges.keys():
-            return self._set_cache(cache_key, exchanges[identifier])
+            return exchanges[identifier]
         
         if not identifier:
             exchange = exchanges[self.get_preferred_exchange_code()]
-            return self._set_cache(cache_key, exchange)
+            return exchange
 
         raise Exception(f"Could not find exchange '{identifier}'")
 
+    @memoized('exchange_goods', depends_on=['rawexchangedata'])
     def get_exchange_goods(self):
         from prunpy.models.exchange import ExchangeGood
-        cache_key = 'exchange_goods'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         exchange_goods = {}
         for good in loader.rawexchangedata:
             # Initialize all exchanges
@@ -365,12 +744,10 @@ class DataLoader:
                 exchange_goods[good['ExchangeCode']] = {}
             exchange_goods[good['ExchangeCode']][good['MaterialTicker']] = ExchangeGood(good)
 
-        return self._set_cache(cache_key, exchange_goods)
+        return exchange_goods
 
+    @memoized('max_pops', depends_on=['all_planets_by_*', 'planet_instance_*', 'all_population_reports'])
     def get_max_population(self):
-        cache_key = 'max_pops'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         max_pop = {dem: 0 for dem in DEMOGRAPHICS}
         for name, planet in self.get_all_planets().items():
             population = planet.get_population_count().population
@@ -378,51 +755,44 @@ class DataLoader:
                 if max_pop[dem] < count:
                     max_pop[dem] = count
 
-        return self._set_cache(cache_key, max_pop)
+        return max_pop
 
+    @memoized('population_upkeep')
     def get_population_upkeep(self):
-        cache_key = 'population_upkeep'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         from prunpy.utils.resource_list import ResourceList
-        rawdata = fio.request("GET", "/global/workforceneeds", cache=60*60*24)
+        rawdata = fio.request(**DATASET_REQUESTS['workforce_needs'])
         needs = {entry['WorkforceType'].lower()+'s': ResourceList(entry['Needs']) for entry in rawdata}
 
-        return self._set_cache(cache_key, needs)
+        return needs
 
+    @memoized('all_recipes', depends_on=[f'all_buildings_{DEFAULT_BUILDING_PLANET_NATURAL_ID}'])
     def get_all_recipes(self):
-        cache_key = 'all_recipes'
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         buildings = self.get_all_buildings()
         recipes = []
         for ticker, building in buildings.items():
             recipes += building.recipes
         
-        return self._set_cache(cache_key, recipes)
+        return recipes
+
+    @property
+    @memoized('recipes', depends_on=['all_recipes'])
+    def recipes(self):
+        """Every recipe, indexed by output, input and building. See RecipeIndex."""
+        from prunpy.models.recipe import RecipeIndex
+        return RecipeIndex(self.get_all_recipes())
 
     # id = "StandardRecipeName" in rawdata
     def get_recipe(self, id):
-        cache_key = 'recipe_' + str(id)
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        for recipe in self.get_all_recipes():
-            if recipe.id == id:
-                return self._set_cache(cache_key, recipe)
-
-        # Raise error
-        raise Exception(f"Could not find recipe '{id}'")
+        recipe = self.recipes.get(id)
+        if recipe is None:
+            raise Exception(f"Could not find recipe '{id}'")
+        return recipe
 
+    @memoized('material_recipes_{ticker}_mining-{include_mining_from_planet_id}_purchase-{include_purchase_from}', depends_on=['recipes', 'planet_index', 'planet_instance_*', 'exchange_*'])
     def get_material_recipes(self, ticker, include_mining_from_planet_id=None, include_purchase_from=None):
         from prunpy.models.recipe import Recipe
-        cache_key = f"material_recipes_{ticker}_mining-{include_mining_from_planet_id}_purchase-{include_purchase_from}"
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
-        # Find recipes that use the material_ticker
-        target_recipes = []
-        for recipe in self.get_all_recipes():
-            if ticker in recipe.outputs.resources.keys():
-                target_recipes.append(recipe)
+        # Find recipes that produce the material
+        target_recipes = self.recipes.producing(ticker)
 
         if include_mining_from_planet_id:
             planet = self.get_planet(include_mining_from_planet_id)
@@ -443,12 +813,10 @@ class DataLoader:
             }
             target_recipes.append(Recipe(purchase_recipe_rawdata))
 
-        return self._set_cache(cache_key, target_recipes)
+        return target_recipes
     
+    @memoized('best_recipe_{ticker}_{priority_mode}', depends_on=['material_recipes_*_mining-*_purchase-*', 'exchange_*'])
     def get_best_recipe(self, ticker, priority_mode='profit_ratio'):
-        cache_key = 'best_recipe_' + str(ticker) + '_' + str(priority_mode)
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         target_recipes = self.get_material_recipes(ticker)
 
         # Pick recipe with highest profit per hour
@@ -469,7 +837,7 @@ class DataLoader:
             else:
                 raise ValueError(f"Invalid priority mode: {priority_mode}")
 
-        return self._set_cache(cache_key, best_recipe)
+        return best_recipe
 
     # Special function to load, prompt, and cache username
     def get_username(self):
@@ -504,15 +872,13 @@ class DataLoader:
     def get_user_company(self):
         return self.get_company(self.username)
 
+    @memoized('company_{company_identifier}')
     def get_company(self, company_identifier):
         from prunpy.models.company import Company
 
-        cache_key = 'company_' + str(company_identifier)
-        if (cached_data := self._get_cached_data(cache_key)) is not None: return cached_data
-
         company = Company(company_identifier)
 
-        return self._set_cache(cache_key, company)
+        return company
 
     def get_preferred_exchange_code(self):
         # Load data from ./preferred_exchange.txt, no caching
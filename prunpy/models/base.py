@@ -31,7 +31,6 @@ class Base:
     def add_building(self, ticker):
         self.building_counts[ticker] += 1
         self.buildings.append(Building(ticker, self.planet))
-        self.update_buildings()
 
     def remove_building(self, ticker):
         if ticker not in self.building_counts:
@@ -6,7 +6,91 @@ from prunpy.models.recipe_queue import RecipeQueue, RecipeQueueItem
 from prunpy.utils.resource_list import ResourceList
 from prunpy.constants import DEFAULT_BUILDING_PLANET_NATURAL_ID, HOUSING_SIZES
 
+EXTRACTORS = ['COL', 'RIG', 'EXT']
+FERTILITY_BUILDINGS = ['FRM', 'ORC']  # Recipes scale with the planet's fertility
+
+def building_environment_key(ticker, planet):
+    """
+    Buildings of ticker on planets with the same key are identical apart from the planet itself,
+    so they share their recipes and construction costs (see DataLoader.get_building_state).
+    """
+    # Extractor recipes come from the planet's own resources
+    if ticker in EXTRACTORS:
+        return planet.natural_id
+
+    environment = planet.environment_class
+    fertility = planet.environment['fertility'] if ticker in FERTILITY_BUILDINGS else None
+    return f"{environment['temperature']}-{environment['pressure']}-{environment['gravity']}-{environment['surface']}-{fertility}"
+
+def build_shared_state(ticker, planet):
+    """The attributes of a Building of ticker on planet that don't depend on the instance."""
+    rawdata = loader.allbuildings_by_ticker.get(ticker)
+    if rawdata is None:
+        raise ValueError(f"Building with ticker {ticker} not found")
+
+    state = {'rawdata': rawdata, 'area': rawdata.get('AreaCost')}
+
+    if ticker in HOUSING_SIZES.keys():
+        state['population_demand'] = Population(HOUSING_SIZES[ticker]).invert()
+    else:
+        state['population_demand'] = Population({
+            'pioneers': rawdata.get('Pioneers'),
+            'settlers': rawdata.get('Settlers'),
+            'technicians': rawdata.get('Technicians'),
+            'engineers': rawdata.get('Engineers'),
+            'scientists': rawdata.get('Scientists'),
+        })
+
+    state['cogc_type'] = rawdata.get('Expertise')
+
+    if ticker in EXTRACTORS:
+        state['type'] = 'extractor'
+        state['recipes'] = _extractor_recipes(ticker, planet)
+    else:
+        state['type'] = 'crafter'
+        state['recipes'] = _crafter_recipes(rawdata, planet)
+
+    if len(state['recipes']) == 0:
+        state['type'] = 'other'
+
+    state['min_construction_materials'] = ResourceList(rawdata.get('BuildingCosts'))
+    extra_materials = planet.get_building_environment_cost(state['area'])
+    state['construction_materials'] = state['min_construction_materials'] + extra_materials
+    return state
+
+def _crafter_recipes(rawdata, planet):
+    recipes = [Recipe(rawrecipe) for rawrecipe in rawdata.get('Recipes', [])]
+
+    if rawdata['Ticker'] in FERTILITY_BUILDINGS:
+        fertility = planet.environment['fertility']
+        if fertility < 0:
+            return []
+        for recipe in recipes:
+            recipe.multipliers['fertility'] = fertility
+    return recipes
+
+def _extractor_recipes(building_ticker, planet):
+    recipes = []
+    for ticker in planet.resources:
+        resource = planet.resources[ticker]
+
+        # Skip resources that aren't for this extractor
+        if resource["extractor_building"] == building_ticker:
+            recipedata = {
+                'building': building_ticker,
+                'name': f"@{building_ticker}=>{resource['process_amount']}x{ticker}",
+                'raw_duration': resource["process_hours"],
+                'inputs': {},
+                'outputs': {
+                    ticker: resource["process_amount"]
+                }
+            }
+            recipes.append(Recipe(recipedata))
+    return recipes
+
 # A single building of a particular ticker. Not a particular one though.
+# Everything but the planet and recipe queue is shared with the other Buildings of the
+# same ticker and environment, so treat recipes and materials as read-only (copy them to modify).
 class Building:
     def __init__(self, ticker, planet=None):
 
@@ -16,84 +100,15 @@ class Building:
         elif isinstance(planet, Planet):
             self.planet = planet
         elif planet is None:
-            self.planet = loader.get_planet(DEFAULT_PLANET_NATURAL_ID)
+            self.planet = loader.get_planet(DEFAULT_BUILDING_PLANET_NATURAL_ID)
         else:
             raise Exception(f"Invalid planet type: {type(planet)}")
 
-        for building in loader.allbuildings_raw:
-            if building['Ticker'] == ticker:
-                self.rawdata = building
-                break
-
-        self.area = self.rawdata.get('AreaCost')
-
-        
-        if self.ticker in HOUSING_SIZES.keys():
-            self.population_demand = Population(HOUSING_SIZES[self.ticker]).invert()
-        else:
-            self.population_demand = Population({
-                'pioneers': self.rawdata.get('Pioneers'),
-                'settlers': self.rawdata.get('Settlers'),
-                'technicians': self.rawdata.get('Technicians'),
-                'engineers': self.rawdata.get('Engineers'),
-                'scientists': self.rawdata.get('Scientists'),
-            })
-
-        self.cogc_type = self.rawdata.get('Expertise')
-
-        is_extractor = self.ticker in ['COL', 'RIG', 'EXT']
-        self.type = 'extractor' if is_extractor else 'crafter'
-        if self.type == 'extractor':
-            self._init_extractor_recipes(self.ticker)
-        else:
-            self._init_crafter_recipes(self.ticker)
-
-        if len(self.recipes) == 0:
-            self.type = 'other'
-
-        self.min_construction_materials = ResourceList(self.rawdata.get('BuildingCosts'))
-        extra_materials = self.planet.get_building_environment_cost(self.area)
-        self.construction_materials = self.min_construction_materials + extra_materials
+        shared_state = loader.get_building_state(ticker, building_environment_key(ticker, self.planet), self.planet)
+        self.__dict__.update(shared_state)
 
         self.recipe_queue = RecipeQueue(5)
 
-    def _init_crafter_recipes(self, building_ticker):
-        for building in loader.allbuildings_raw:
-            if building['Ticker'] == building_ticker:
-                rawrecipes = building.get('Recipes', [])
-                self.recipes = []
-                for rawrecipe in rawrecipes:
-                    recipe = Recipe(rawrecipe)
-                    self.recipes.append(recipe)
-
-        if self.ticker in ['FRM', 'ORC']:
-            if self.planet.environment['fertility'] < 0:
-                self.recipes = []
-                return
-            else:
-                for recipe in self.recipes:
-                    fertility = self.planet.environment['fertility']
-                    recipe.multipliers['fertility'] = fertility
-
-
-    def _init_extractor_recipes(self, building_ticker):
-        self.recipes = []
-        for ticker in self.planet.resources:
-            resource = self.planet.resources[ticker]
-
-            # Skip resources that aren't for this extractor
-            if resource["extractor_building"] == building_ticker:
-                recipedata = {
-                    'building': building_ticker,
-                    'name': f"@{building_ticker}=>{resource['process_amount']}x{ticker}",
-                    'raw_duration': resource["process_hours"],
-                    'inputs': {},
-                    'outputs': {
-                        ticker: resource["process_amount"]
-                    }
-                }
-                self.recipes.append(Recipe(recipedata))
-
     def queue_recipe(self, recipe, order_size=1):
         if not isinstance(recipe, Recipe):
             raise TypeError
@@ -130,7 +145,7 @@ class Building:
         return self.population_demand.get_housing_needs(priority)
 
     def is_extractor(self):
-        return self.ticker in ['COL', 'RIG', 'EXT']
+        return self.ticker in EXTRACTORS
 
     def get_cogc_bonus(self, cogc=None):
         if not cogc: return 1.0
@@ -5,8 +5,7 @@ import json
 class Exchange:
     def __init__(self, rawdata, exchange_goods):
         if isinstance(rawdata, str):
-            rawexchanges = fio.request("GET", "/exchange/station", cache='forever')
-            for rawexchange in rawexchanges:
+            for rawexchange in loader.rawexchanges:
                 if rawexchange['ComexCode'] == rawdata:
                     rawdata = rawexchange
 
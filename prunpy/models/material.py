@@ -2,7 +2,8 @@ from prunpy.models.logistics import Container
 
 class Material:
 
-    def __new__(cls, rawdata_or_ticker):
+    # rawdata_or_ticker is None when unpickling, e.g. from a loader snapshot
+    def __new__(cls, rawdata_or_ticker=None):
         if isinstance(rawdata_or_ticker, Material):
             return rawdata_or_ticker  # Return the same instance if already Material
 
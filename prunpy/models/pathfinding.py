@@ -1,35 +1,26 @@
 #!/usr/bin/env python3
 
-import csv
 import heapq
-import os
+from collections import deque
 from prunpy.api import fio
+from prunpy.utils.shared_csv import SharedCsvCache
 import json
 
 CACHE_FILE = './cache/jump_distance.csv'
 
-# Load the cache when the script is run or imported
-def load_cache():
-    cache = {}
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r') as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip the header
-            for row in reader:
-                origin, destination, distance = row
-                cache[(origin, destination)] = int(distance)
-    return cache
+def parse_distance(value):
+    # Unreachable systems are stored as inf
+    return float(value) if value == 'inf' else int(value)
 
-cache = load_cache()
+# Jump distances already computed, shared with other processes through CACHE_FILE
+cache = SharedCsvCache(CACHE_FILE, ['origin', 'destination', 'distance'], parse_distance)
 
 def save_to_cache(origin, destination, distance):
-    with open(CACHE_FILE, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([origin, destination, distance])
-    cache[(origin, destination)] = distance
+    return cache.add((origin, destination), distance)
 
 def read_system_links(filename):
     graph = {}
+    # Parsed once per process; later calls are served from fio's memo
     links = fio.request('GET', '/csv/systemlinks', response_format='csv', cache=True)
     for pair in links:
         left = pair['Left']
@@ -86,9 +77,21 @@ def jump_distance(origin, destination):
     path = a_star_search(graph, origin, destination)
     distance = number_of_jumps(path)
     
-    save_to_cache(origin, destination, distance)
-    
-    return distance
+    # Another worker may have stored it meanwhile; both computed the same distance
+    return save_to_cache(origin, destination, distance)
+
+def jump_distances_from(origin):
+    """{system: jumps} from origin to every system reachable from it, in one breadth-first search."""
+    graph = read_system_links('systemlinks.csv')
+    distances = {origin: 0}
+    queue = deque([origin])
+    while queue:
+        current = queue.popleft()
+        for neighbor in graph.get(current, []):
+            if neighbor not in distances:
+                distances[neighbor] = distances[current] + 1
+                queue.append(neighbor)
+    return distances
 
 def appx_travel_time(jumps):
     return jumps*3+6+4
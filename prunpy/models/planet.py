@@ -11,6 +11,24 @@ from prunpy.utils.terminal_formatting import terminal_format
 import math
 import time
 import json
+from collections.abc import Mapping
+
+def current_cogc_program(rawdata):
+    """The COGC program running on a planet now, e.g. 'AGRICULTURE', or '' if there is none."""
+    current_time_ms = int(time.time() * 1000)
+    for period in rawdata.get("COGCPrograms", []):
+        if period["StartEpochMs"] <= current_time_ms <= period["EndEpochMs"]:
+            if period["ProgramType"]:
+                raw_cogc = period["ProgramType"]
+
+                # Remove "ADVERTISING_" or "WORKFORCE_" from the start if present
+                if raw_cogc.startswith("ADVERTISING_"):
+                    return raw_cogc[len("ADVERTISING_"):]
+                elif raw_cogc.startswith("WORKFORCE_"):
+                    return raw_cogc[len("WORKFORCE_"):]
+                return raw_cogc
+            break
+    return ""
 
 class Planet:
     # Constructor
@@ -26,23 +44,7 @@ class Planet:
         #self.exchange = self.get_nearest_exchange()
 
         # Set current COGC program
-        self.cogc = ""
-        if len(self.rawdata.get('COGCPrograms', [])) > 0:
-            current_time_ms = int(time.time() * 1000)
-            for period in self.rawdata.get("COGCPrograms", []):
-                if period["StartEpochMs"] <= current_time_ms <= period["EndEpochMs"]:
-                    if period["ProgramType"]:
-                        raw_cogc = period["ProgramType"]
-
-                        # Remove "ADVERTISING_" or "WORKFORCE_" from the start if present
-                        if raw_cogc.startswith("ADVERTISING_"):
-                            self.cogc = raw_cogc[len("ADVERTISING_"):]
-                        elif raw_cogc.startswith("WORKFORCE_"):
-                            self.cogc = raw_cogc[len("WORKFORCE_"):]
-                        else:
-                            self.cogc = raw_cogc
-                    break
-
+        self.cogc = current_cogc_program(self.rawdata)
 
         # Process the resources in rawdata
         for resource in self.rawdata.get('Resources', []):
@@ -74,6 +76,7 @@ class Planet:
                 'volume': material.volume,
                 'type': resource_type,
                 'factor': factor, # Not in Recipe (Shouldn't be but should be accessible somehow)
+                'factor_range': loader.factor_ranges.get(ticker, (factor, factor)), # Lowest and highest factor on any planet
                 'extractor_building': extractor_building,
                 'daily_amount': daily_amount, # Not in Recipe
                 'process_amount': process_amount,
@@ -311,3 +314,27 @@ class Planet:
     def __str__(self):
         # Note: Reimplement once Planet.system class is added
         return f"(Planet {self.name} ({self.natural_id}) in the {self.system_natural_id} system)"
+
+
+class LazyPlanetMap(Mapping):
+    """
+    A read-only dict of planets that only builds each Planet when it's first accessed.
+    The planets come from get_planet(natural_id), so maps keyed differently share instances.
+
+    :param natural_ids: {key: natural_id}, e.g. planet names to their natural ids.
+    """
+    def __init__(self, natural_ids, get_planet):
+        self._natural_ids = natural_ids
+        self._get_planet = get_planet
+
+    def __getitem__(self, key):
+        return self._get_planet(self._natural_ids[key])
+
+    def __contains__(self, key):
+        return key in self._natural_ids
+
+    def __iter__(self):
+        return iter(self._natural_ids)
+
+    def __len__(self):
+        return len(self._natural_ids)
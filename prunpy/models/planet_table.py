@@ -0,0 +1,134 @@
+import numpy as np
+
+from prunpy.constants import PLANET_THRESHOLDS, DEMOGRAPHICS
+from prunpy.models.planet import current_cogc_program
+
+INFRASTRUCTURE_KEYS = ['HasLocalMarket', 'HasChamberOfCommerce', 'HasWarehouse', 'HasAdministrationCenter', 'HasShipyard']
+
+class PlanetTable:
+    """
+    Every planet's attributes as NumPy columns, one row per planet, so filters and scores
+    can be computed over the whole universe at once instead of planet by planet.
+    Values match what Planet computes from the same raw data.
+
+        table = loader.planet_table
+        mask = (table.factor('H2O') > 0.2) & (table.fertility != -1) & table.surface
+        table.ranked(table.factor('H2O'), mask, limit=10)
+
+    Population and nearest exchange columns are computed on first use, and again
+    whenever the loader reloads the data they come from.
+    """
+    def __init__(self, planet_records, materials_raw):
+        records = list(planet_records)
+        self.natural_ids = np.array([planet['PlanetNaturalId'] for planet in records], dtype=object)
+        self.index = {natural_id: row for row, natural_id in enumerate(self.natural_ids)}  # {natural_id: row}
+        self.names = np.array([planet.get('PlanetName') or planet['PlanetNaturalId'] for planet in records], dtype=object)
+        self.system_natural_ids = np.array([natural_id[:-1] for natural_id in self.natural_ids], dtype=object)
+
+        self.temperature = np.array([planet.get('Temperature') for planet in records], dtype=float)
+        self.pressure = np.array([planet.get('Pressure') for planet in records], dtype=float)
+        self.gravity = np.array([planet.get('Gravity') for planet in records], dtype=float)
+        # -1 for infertile planets, as in Planet.environment
+        fertility = np.array([float(planet.get('Fertility')) for planet in records])
+        self.fertility = np.where(fertility == -1.0, -1.0, fertility * 10/33)
+        self.surface = np.array([bool(planet.get('Surface')) for planet in records], dtype=bool)
+        self.cogc = np.array([current_cogc_program(planet) for planet in records], dtype=object)
+        self.has_infrastructure = np.array([any(planet.get(key) for key in INFRASTRUCTURE_KEYS) for planet in records], dtype=bool)
+
+        # Dense planets x materials matrix of resource factors, 0 where a planet lacks a resource
+        tickers = {material['MaterialId']: material['Ticker'] for material in materials_raw}
+        self.tickers = sorted(tickers.values())
+        self.ticker_index = {ticker: column for column, ticker in enumerate(self.tickers)}  # {ticker: column}
+        self.factors = np.zeros((len(records), len(self.tickers)))
+        for row, planet in enumerate(records):
+            for resource in planet.get('Resources', []):
+                ticker = tickers.get(resource.get('MaterialId'))
+                if ticker is not None:
+                    self.factors[row, self.ticker_index[ticker]] = resource.get('Factor', 0)
+
+        self.demographics = list(DEMOGRAPHICS)
+        self._population = None  # (population reports it was computed from, counts)
+        self._exchanges = None  # (exchanges it was computed from, codes, distances)
+
+    def factor(self, ticker):
+        """Every planet's resource factor for ticker, 0 where it has none."""
+        return self.factors[:, self.ticker_index[ticker]]
+
+    def environment_class(self, prop):
+        """'low', 'normal' or 'high' per planet for temperature, pressure or gravity, as in Planet.environment_class."""
+        values = getattr(self, prop)
+        low, high = PLANET_THRESHOLDS[prop]
+        return np.where(values < low, 'low', np.where(values > high, 'high', 'normal'))
+
+    @property
+    def population(self):
+        """Planets x demographics matrix of population counts, in the order of self.demographics."""
+        from prunpy.data_loader import loader
+        reports = loader.all_population_reports
+        if self._population is None or self._population[0] is not reports:
+            self._population = (reports, self._population_counts(reports))
+        return self._population[1]
+
+    def _population_counts(self, all_population_reports):
+        counts = np.zeros((len(self.natural_ids), len(self.demographics)), dtype=int)
+        # e.g. 'pioneers' -> 'NextPopulationPioneer'
+        keys = [f"NextPopulation{demographic[:-1].capitalize()}" for demographic in self.demographics]
+        for natural_id, reports in all_population_reports.items():
+            row = self.index.get(natural_id)
+            # Same as Planet.get_population_data: the count is the previous report's next population
+            if row is None or len(reports) < 2:
+                continue
+            counts[row] = [reports[-2][key] for key in keys]
+        return counts
+
+    @property
+    def exchange_codes(self):
+        """Code of each planet's nearest exchange, by jumps."""
+        return self._nearest_exchanges()[0]
+
+    @property
+    def exchange_distances(self):
+        """Jumps from each planet to its nearest exchange, inf where none can be reached."""
+        return self._nearest_exchanges()[1]
+
+    def _nearest_exchanges(self):
+        from prunpy.data_loader import loader
+        from prunpy.models.pathfinding import jump_distances_from
+
+        rawexchanges = loader.rawexchanges
+        if self._exchanges is None or self._exchanges[0] is not rawexchanges:
+            # One search per exchange over the system links instead of one per planet and exchange
+            systems, system_rows = np.unique(self.system_natural_ids.astype(str), return_inverse=True)
+            distances = np.full((len(rawexchanges), len(systems)), np.inf)
+            for i, exchange in enumerate(rawexchanges):
+                reachable = jump_distances_from(exchange['SystemNaturalId'])
+                distances[i] = [reachable.get(system, np.inf) for system in systems.tolist()]
+
+            codes = np.array([exchange['ComexCode'] for exchange in rawexchanges], dtype=object)
+            nearest = distances.argmin(axis=0)
+            self._exchanges = (rawexchanges, codes[nearest][system_rows], distances.min(axis=0)[system_rows])
+        return self._exchanges[1], self._exchanges[2]
+
+    def rows(self, natural_ids):
+        """Row numbers of the given planets, for indexing columns."""
+        return np.array([self.index[natural_id] for natural_id in natural_ids], dtype=int)
+
+    def where(self, mask):
+        """Natural ids of the planets where mask is True."""
+        return self.natural_ids[mask].tolist()
+
+    def ranked(self, scores, mask=None, limit=None):
+        """[(natural_id, score)] from highest to lowest score, over the planets where mask is True."""
+        rows = np.arange(len(self.natural_ids)) if mask is None else np.flatnonzero(mask)
+        rows = rows[np.argsort(-scores[rows], kind='stable')][:limit]
+        return list(zip(self.natural_ids[rows].tolist(), scores[rows].tolist()))
+
+    def __getstate__(self):
+        # Population and exchange columns are recomputed from the loader's data after unpickling
+        state = dict(self.__dict__)
+        state['_population'] = None
+        state['_exchanges'] = None
+        return state
+
+    def __len__(self):
+        return len(self.natural_ids)
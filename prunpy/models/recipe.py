@@ -140,3 +140,42 @@ class Recipe:
             return f"{self.outputs} <= {self.inputs} in {self.raw_duration:.1f}h @{self.building:<3}"
         else:
             return f"{self.outputs} <= {self.inputs} in {self.duration:.1f}h (x{self.multiplier:.0%}) @{self.building:<3}"
+
+class RecipeIndex:
+    """
+    Recipes indexed by id, by the materials they produce and consume, and by the building
+    that makes them, e.g. loader.recipes.producing('RAT').
+    """
+    def __init__(self, recipes):
+        self.all = list(recipes)
+        self.by_id = {}
+        self.by_output = {}
+        self.by_input = {}
+        self.by_building = {}
+
+        for recipe in self.all:
+            self.by_id.setdefault(recipe.id, recipe)
+            for ticker in recipe.outputs.resources:
+                self.by_output.setdefault(ticker, []).append(recipe)
+            for ticker in recipe.inputs.resources:
+                self.by_input.setdefault(ticker, []).append(recipe)
+            self.by_building.setdefault(recipe.building, []).append(recipe)
+
+    # The lists returned are copies, so callers can add to or sort them freely
+    def producing(self, ticker):
+        return list(self.by_output.get(ticker, []))
+
+    def consuming(self, ticker):
+        return list(self.by_input.get(ticker, []))
+
+    def in_building(self, building_ticker):
+        return list(self.by_building.get(building_ticker, []))
+
+    def get(self, id):
+        return self.by_id.get(id)
+
+    def __iter__(self):
+        return iter(self.all)
+
+    def __len__(self):
+        return len(self.all)
@@ -1,4 +1,3 @@
-import numpy as np
 import math
 from prunpy.data_loader import loader
 from prunpy.models.recipe import Recipe
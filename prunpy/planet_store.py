@@ -0,0 +1,122 @@
+import gzip
+import json
+import time
+
+from prunpy.api import fio
+from prunpy.utils.file_lock import atomic_write, file_lock
+
+PLANET_STORE_FILE = './cache/planet_store.json.gz'
+PLANET_RECORD_MAX_AGE = 60*60*24*7  # seconds; every planet is re-checked at least this often
+# With more planets due than this, one full download is cheaper than fetching them one by one
+# (each /planet/<id> request costs a slot at the API's rate limit of about 2 per second)
+INCREMENTAL_SYNC_MAX_REQUESTS = 30
+
+PLANET_LIST_REQUEST = {'method': 'GET', 'endpoint': '/planet/allplanets', 'cache': 60*60}
+PLANET_FULL_REQUEST = {'method': 'GET', 'endpoint': '/planet/allplanets/full', 'cache': 60*60}
+
+class PlanetStore:
+    """
+    Local copy of every planet record, kept up to date planet by planet.
+
+    A sync lists the planet ids and names (a small response), then fetches through /planet/<id>
+    only the planets that are new, renamed or due: checked longer than PLANET_RECORD_MAX_AGE ago,
+    or with a COGC program that has ended since. A record counts as changed when its Timestamp
+    differs. Without a store, or with more than INCREMENTAL_SYNC_MAX_REQUESTS planets to fetch,
+    it falls back to the full download.
+
+    The listing carries nothing else that changes, so any other change to a planet (resources,
+    infrastructure, population) is only seen once its record is due, up to PLANET_RECORD_MAX_AGE
+    later. The 'full' planet sync mode sees every change within the hour instead.
+    """
+    def __init__(self, path=PLANET_STORE_FILE):
+        self.path = path
+        self.planets = {}  # {natural_id: record}
+        self.checked_at = {}  # {natural_id: when its record was last fetched}
+
+    def load(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as store_file:
+                store = json.load(store_file)
+            self.planets, self.checked_at = store['planets'], store['checked_at']
+        except (FileNotFoundError, EOFError, OSError, ValueError, KeyError):
+            self.planets, self.checked_at = {}, {}
+
+    def save(self):
+        store = {'planets': self.planets, 'checked_at': self.checked_at}
+        atomic_write(self.path, gzip.compress(json.dumps(store, separators=(',', ':')).encode('utf-8'), compresslevel=5))
+
+    def is_due(self, natural_id, now=None, listed_name=None):
+        now = now or time.time()
+        if listed_name is not None and listed_name != self.planets[natural_id].get('PlanetName'):
+            return True
+        checked_at = self.checked_at.get(natural_id, 0)
+        if now - checked_at > PLANET_RECORD_MAX_AGE:
+            return True
+
+        # A COGC program ended since the record was fetched, so the next one may have been voted in
+        for period in self.planets[natural_id].get('COGCPrograms') or []:
+            if checked_at * 1000 < period['EndEpochMs'] <= now * 1000:
+                return True
+        return False
+
+    def sync(self):
+        """
+        Bring the store up to date.
+
+        :return: The natural ids of planets added, changed or removed since the last sync.
+        """
+        # Workers sharing the cache sync one at a time; the others then find little left to do
+        with file_lock(self.path + '.lock'):
+            self.load()
+            now = time.time()
+            if not self.planets:
+                return self._full_sync(now)
+
+            listed = {planet['PlanetNaturalId']: planet.get('PlanetName') for planet in fio.request(**PLANET_LIST_REQUEST)}
+            removed = set(self.planets) - set(listed)
+            to_fetch = [natural_id for natural_id, name in listed.items() if natural_id not in self.planets or self.is_due(natural_id, now, name)]
+            if len(to_fetch) > INCREMENTAL_SYNC_MAX_REQUESTS:
+                return self._full_sync(now)
+
+            try:
+                records = fio.request_many([{'method': 'GET', 'endpoint': f"/planet/{natural_id}"} for natural_id in to_fetch])
+            except Exception as e:
+                print(f"Incremental planet sync failed ({e}), downloading all planets instead")
+                return self._full_sync(now)
+
+            changed = set(removed)
+            for natural_id in removed:
+                del self.planets[natural_id]
+                self.checked_at.pop(natural_id, None)
+            for natural_id, record in zip(to_fetch, records):
+                if self._has_changed(self.planets.get(natural_id), record):
+                    changed.add(natural_id)
+                self.planets[natural_id] = record
+                self.checked_at[natural_id] = now
+
+            if to_fetch or removed:
+                self.save()
+            return changed
+
+    def _full_sync(self, now):
+        changed = set(self.planets)
+        planets = {}
+        for record in fio.request(**PLANET_FULL_REQUEST, lazy=True):
+            natural_id = record['PlanetNaturalId']
+            if not self._has_changed(self.planets.get(natural_id), record):
+                changed.discard(natural_id)
+            else:
+                changed.add(natural_id)
+            planets[natural_id] = record
+
+        self.planets = planets
+        self.checked_at = {natural_id: now for natural_id in planets}
+        self.save()
+        return changed
+
+    def _has_changed(self, old_record, new_record):
+        if old_record is None:
+            return True
+        if 'Timestamp' in new_record:
+            return old_record.get('Timestamp') != new_record['Timestamp'] or old_record.get('PlanetName') != new_record.get('PlanetName')
+        return old_record != new_record
@@ -0,0 +1,139 @@
+import json
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+from prunpy.utils.file_lock import file_lock
+
+BACKOFF_FACTOR = 0.5  # Rate multiplier applied when the server throttles us
+RECOVERY_FRACTION = 0.1  # Fraction of max_rate regained after each successful request
+MIN_RATE = 0.1  # requests per second
+BASE_BACKOFF = 1  # seconds, doubled per attempt when the server gives no Retry-After
+MAX_BACKOFF = 60  # seconds
+JITTER = 0.25  # Up to this fraction is added to every backoff so that workers don't retry in lockstep
+
+THROTTLE_STATUSES = [429, 503]
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, base=BASE_BACKOFF):
+    """Exponential backoff with jitter for the given (0-based) retry attempt."""
+    delay = min(MAX_BACKOFF, base * 2 ** attempt)
+    return delay * random.uniform(1, 1 + JITTER)
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket that slows down when the server throttles and speeds back up as requests succeed.
+
+    Callers reserve a token in acquire() and sleep outside the lock, so threads queue up at the
+    current rate. With a state_file, the bucket lives on disk behind a file lock and is shared by
+    every process pointing at the same file.
+    """
+    def __init__(self, rate, capacity=1, min_rate=MIN_RATE, max_rate=None, state_file=None):
+        self.max_rate = max_rate or rate
+        self.min_rate = min(min_rate, self.max_rate)
+        self.capacity = capacity
+        self.state_file = state_file
+
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.time()
+        self.blocked_until = 0
+
+        self._lock = threading.Lock()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r') as state_file:
+                state = json.load(state_file)
+            self.rate = min(max(state['rate'], self.min_rate), self.max_rate)
+            self.tokens = min(state['tokens'], self.capacity)
+            self.updated = state['updated']
+            self.blocked_until = state['blocked_until']
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass  # Keep our own state; the next save repairs the file
+
+    def _save_state(self):
+        state = {'rate': self.rate, 'tokens': self.tokens, 'updated': self.updated, 'blocked_until': self.blocked_until}
+        with open(self.state_file, 'w') as state_file:
+            json.dump(state, state_file)
+
+    def _update(self, change):
+        """Apply change() to the bucket, synchronised with other threads and, if shared, other processes."""
+        with self._lock:
+            if self.state_file is None:
+                return change()
+            with file_lock(self.state_file + '.lock'):
+                self._load_state()
+                result = change()
+                self._save_state()
+                return result
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Wait for a request slot. Returns the seconds slept."""
+        def reserve():
+            now = time.time()
+            self._refill(now)
+            self.tokens -= 1
+            start = max(now, self.blocked_until)
+            if self.tokens < 0:
+                start = max(start, now + -self.tokens / self.rate)
+            return start
+
+        time_to_wait = self._update(reserve) - time.time()
+        if time_to_wait > 0:
+            time.sleep(time_to_wait)
+            return time_to_wait
+        return 0
+
+    def on_success(self, headers=None):
+        """Recover towards max_rate, and respect X-RateLimit-Remaining/Reset if the server sends them."""
+        headers = headers or {}
+        def recover():
+            self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_FRACTION)
+
+            remaining, reset = headers.get('X-RateLimit-Remaining'), headers.get('X-RateLimit-Reset')
+            if remaining is not None and reset is not None:
+                try:
+                    if int(float(remaining)) <= 0:
+                        reset = float(reset)
+                        # Either an epoch timestamp or seconds from now
+                        self.blocked_until = max(self.blocked_until, reset if reset > 1e9 else time.time() + reset)
+                except ValueError:
+                    pass
+        self._update(recover)
+
+    def on_throttled(self, headers=None, attempt=0):
+        """Back off after a 429/503. Returns how long the caller should wait before retrying."""
+        headers = headers or {}
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        def throttle():
+            now = time.time()
+            # Concurrent requests throttled in the same episode only slow the bucket down once
+            if now >= self.blocked_until:
+                self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+            if retry_after is not None:
+                delay = retry_after * random.uniform(1, 1 + JITTER)
+            else:
+                delay = backoff_delay(attempt)
+            self.blocked_until = max(self.blocked_until, now + delay)
+            # Don't let tokens saved up before the throttle turn into a burst afterwards
+            self.tokens = min(self.tokens, 0)
+            return self.blocked_until - now
+        return self._update(throttle)
@@ -0,0 +1,174 @@
+import os
+import time
+import pickle
+import fnmatch
+import hashlib
+
+from prunpy.api import fio
+from prunpy.utils.file_lock import atomic_write
+
+SNAPSHOT_FILE = './cache/loader_snapshot.pickle'
+SNAPSHOT_VERSION = 1  # Bump when the layout of the snapshot itself changes
+
+# What build() loads before saving, by name. Each is built along with everything it depends on.
+SNAPSHOT_CONTENTS = {
+    'materials': lambda loader: (loader.materials_by_ticker, loader.materials_by_hash, loader.material_ticker_list),
+    'planets': lambda loader: (loader.planet_index, loader.planet_table, list(loader.get_all_planets('natural_id').values())),
+    'buildings': lambda loader: loader.get_all_buildings(),
+    'recipes': lambda loader: loader.recipes,
+    'exchanges': lambda loader: loader.get_all_exchanges(),
+    'price_history': lambda loader: loader.get_all_exchange_price_history(),
+}
+
+# Cache keys never saved: they're cheap to rebuild, or hold a reference to the loader itself
+SNAPSHOT_EXCLUDED = ['all_planets_by_*']
+
+def code_fingerprint():
+    """Changes whenever prunpy's source does, since pickled objects depend on the classes that made them."""
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for directory, _, filenames in sorted(os.walk(package_dir)):
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                stat = os.stat(os.path.join(directory, filename))
+                digest.update(f"{filename}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+def _source_datasets():
+    """{DATASET_GRAPH node: DATASET_REQUESTS name} for the nodes loaded straight from a request."""
+    from prunpy.data_loader import DATASET_REQUESTS, DATASET_LOADER_KEYS
+    return {DATASET_LOADER_KEYS.get(name, name): name for name in DATASET_REQUESTS}
+
+def _dataset_fingerprint(loader, dataset):
+    from prunpy.data_loader import DATASET_REQUESTS
+    # Incrementally synced planets come from the planet store, not the full download
+    if dataset == 'allplanets' and loader.planet_sync_mode == 'incremental':
+        try:
+            stat = os.stat(loader.planet_store.path)
+        except FileNotFoundError:
+            return None
+        return f"store:{stat.st_mtime_ns}:{stat.st_size}"
+    return fio.fingerprint(**DATASET_REQUESTS[dataset])
+
+def _is_current(loader, dataset, snapshot):
+    """Whether the loader would now build dataset from the same response the snapshot was built from."""
+    from prunpy.data_loader import DATASET_REQUESTS, DATASET_LOADER_KEYS, LOADER_CACHE_GROUPS
+
+    # Volatile data is kept for its group's ttl from when it was loaded, like in a long-running script
+    group = loader._cache_group(DATASET_LOADER_KEYS.get(dataset, dataset))
+    if group is not None:
+        loaded_at = snapshot['group_loaded_at'].get(group, snapshot['created_at'])
+        if time.time() - loaded_at > LOADER_CACHE_GROUPS[group]['ttl']:
+            return False
+        # Requests made with cache=0 aren't kept in the response cache, so there's nothing to compare
+        if snapshot['fingerprints'][dataset] is None:
+            return True
+
+    fingerprint = snapshot['fingerprints'][dataset]
+    if fingerprint is None or _dataset_fingerprint(loader, dataset) != fingerprint:
+        return False
+    if group is not None or (dataset == 'allplanets' and loader.planet_sync_mode == 'incremental'):
+        return True
+    if fio.is_cached(**DATASET_REQUESTS[dataset]):
+        return True
+
+    # Expired: revalidate it now (usually a 304), and keep what was built from it if nothing changed
+    _revalidate(dataset)
+    return _dataset_fingerprint(loader, dataset) == fingerprint
+
+def _revalidate(dataset):
+    from prunpy.data_loader import DATASET_REQUESTS
+    try:
+        # Lazy, so the response is saved without being parsed
+        records = fio.request(**DATASET_REQUESTS[dataset], lazy=True)
+        if hasattr(records, 'close'):
+            records.close()
+    except Exception as e:
+        print(f"Could not revalidate {dataset}: {e}")
+
+def build(loader, contents=tuple(SNAPSHOT_CONTENTS), path=SNAPSHOT_FILE):
+    """
+    Load everything named in contents (see SNAPSHOT_CONTENTS), then save every cache key
+    built from API data to path.
+
+    :return: The number of cache keys saved.
+    """
+    from prunpy.data_loader import PREFETCH_GROUPS
+    loader.prefetch([name for name in contents if name in PREFETCH_GROUPS])
+    for name in contents:
+        SNAPSHOT_CONTENTS[name](loader)
+
+    source_datasets = _source_datasets()
+    entries, sources = {}, {}
+    for key, value in list(loader._cache.items()):
+        if any(fnmatch.fnmatchcase(key, pattern) for pattern in SNAPSHOT_EXCLUDED):
+            continue
+        node = loader._dataset_node(key)
+        if node is None:
+            continue
+        datasets = sorted(source_datasets[dependency] for dependency in loader.dependencies([node]) | {node} if dependency in source_datasets)
+        # Keys not built from API data (e.g. companies) can't be checked for staleness
+        if not datasets:
+            continue
+        try:
+            pickle.dumps(value, protocol=5)
+        except Exception as e:
+            print(f"Leaving {key} out of the snapshot: {e}")
+            continue
+        entries[key] = value
+        sources[key] = datasets
+
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'code': code_fingerprint(),
+        'created_at': time.time(),
+        'fingerprints': {dataset: _dataset_fingerprint(loader, dataset) for dataset in set().union(*sources.values())},
+        'group_loaded_at': dict(loader._group_loaded_at),
+        'sources': sources,
+        # Pickled together, so objects shared between keys stay shared
+        'entries': entries,
+    }
+    atomic_write(path, pickle.dumps(snapshot, protocol=5))
+    return len(entries)
+
+def load(loader, path=SNAPSHOT_FILE):
+    """
+    Fill the loader's cache from a snapshot, skipping keys already loaded and keys built
+    from data that has changed, or would be fetched again, since the snapshot was built.
+
+    :return: The cache keys loaded. Empty if there's no usable snapshot.
+    """
+    try:
+        with open(path, 'rb') as snapshot_file:
+            snapshot = pickle.load(snapshot_file)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return []
+
+    if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('code') != code_fingerprint():
+        return []
+
+    current = {dataset for dataset in snapshot['fingerprints'] if _is_current(loader, dataset, snapshot)}
+    loaded = []
+    with loader._key_locks_lock:
+        for key, value in snapshot['entries'].items():
+            if key in loader._cache or not set(snapshot['sources'][key]) <= current:
+                continue
+            group = loader._cache_group(key)
+            if group is not None:
+                loader._group_loaded_at.setdefault(group, snapshot['group_loaded_at'].get(group, snapshot['created_at']))
+            loader._cache[key] = value
+            loaded.append(key)
+    return loaded
+
+def describe(path=SNAPSHOT_FILE):
+    """A short summary of the snapshot at path, or None if there isn't one."""
+    try:
+        with open(path, 'rb') as snapshot_file:
+            snapshot = pickle.load(snapshot_file)
+    except FileNotFoundError:
+        return None
+    age = time.time() - snapshot['created_at']
+    return f"{len(snapshot['entries'])} keys from {len(snapshot['fingerprints'])} datasets, built {age/60:.0f} minutes ago"
@@ -0,0 +1,105 @@
+import re
+import json
+import atexit
+import threading
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket catches everything above
+HISTOGRAM_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+COUNTERS = ['requests', 'cache_hit', 'memo_hit', 'cache_miss', 'coalesced', 'cache_stale', 'revalidated', 'bytes', 'retries', 'errors']
+TIMERS = ['network', 'rate_limit_sleep', 'cache_read', 'parse']
+
+# Routes with parameters, as families where '*' marks a parameter. Tried in order, so fixed
+# routes that a parameter route would also match go first.
+ENDPOINT_ROUTES = [
+    '/planet/allplanets',
+    '/planet/allplanets/full',
+    '/planet/sites/*',
+    '/planet/*',
+    '/exchange/cxpc/full',
+    '/exchange/cxpc/*',
+    '/company/code/*',
+    '/company/name/*',
+    '/localmarket/planet/*',
+    '/ship/ships/*',
+    '/sites/*',
+    '/user/*',
+    '/production/*/*',
+    '/storage/*/*',
+]
+
+def endpoint_family(endpoint):
+    """
+    Group endpoints by their route, replacing parameters with '*',
+    e.g. /planet/sites/XG-326a -> /planet/sites/*
+
+    Routes in ENDPOINT_ROUTES are matched by position. Other endpoints keep their segments
+    while they look like route words (lowercase letters only).
+    """
+    segments = endpoint.strip('/').split('/')
+    for route in ENDPOINT_ROUTES:
+        route_segments = route.strip('/').split('/')
+        if len(route_segments) == len(segments) and all(r == '*' or r == s for r, s in zip(route_segments, segments)):
+            return route
+
+    family = []
+    for segment in segments:
+        if not re.fullmatch(r'[a-z]+', segment):
+            family.append('*')
+            break
+        family.append(segment)
+    return '/' + '/'.join(family)
+
+class RequestStats:
+    """Thread-safe counters and timing histograms for FIOAPI, per endpoint family."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+
+    def _family(self, family):
+        if family not in self._families:
+            self._families[family] = {
+                'counters': {name: 0 for name in COUNTERS},
+                'timers': {name: {'count': 0, 'total': 0.0, 'max': 0.0, 'histogram': [0] * (len(HISTOGRAM_BUCKETS) + 1)} for name in TIMERS},
+            }
+        return self._families[family]
+
+    def count(self, endpoint, name, amount=1):
+        with self._lock:
+            self._family(endpoint_family(endpoint))['counters'][name] += amount
+
+    def observe(self, endpoint, name, seconds):
+        with self._lock:
+            timer = self._family(endpoint_family(endpoint))['timers'][name]
+            timer['count'] += 1
+            timer['total'] += seconds
+            timer['max'] = max(timer['max'], seconds)
+            timer['histogram'][bisect_left(HISTOGRAM_BUCKETS, seconds)] += 1
+
+    def snapshot(self):
+        """A JSON-serializable copy of every family's counters and timers, plus totals."""
+        with self._lock:
+            families = json.loads(json.dumps(self._families))
+
+        totals = {'counters': {name: 0 for name in COUNTERS}, 'timers': {name: 0.0 for name in TIMERS}}
+        for family in families.values():
+            for name, value in family['counters'].items():
+                totals['counters'][name] += value
+            for name, timer in family['timers'].items():
+                totals['timers'][name] += timer['total']
+                timer['mean'] = timer['total'] / timer['count'] if timer['count'] else 0.0
+                timer['buckets'] = HISTOGRAM_BUCKETS + ['inf']
+
+        return {'families': families, 'totals': totals}
+
+    def reset(self):
+        with self._lock:
+            self._families = {}
+
+    def dump(self, path):
+        with open(path, 'w') as stats_file:
+            json.dump(self.snapshot(), stats_file, indent=2)
+
+    def dump_at_exit(self, path):
+        atexit.register(self.dump, path)
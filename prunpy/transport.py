@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+"""
+Transports are what FIOAPI sends requests through. Each one has
+send(method, url, headers, data) returning a requests.Response-like object.
+- SessionTransport talks to the real server over a pooled keep-alive session
+- RecordingTransport wraps another transport and saves every response as a fixture
+- ReplayTransport serves saved fixtures in-process, with simulated latency and rate limits
+"""
+
+import re
+import os
+import sys
+import gzip
+import json
+import time
+import threading
+import argparse
+from collections import deque
+from urllib.parse import urlparse, urlencode
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# requests is imported where it's first needed, so importing prunpy stays cheap
+
+# Response headers kept in recorded fixtures
+RECORDED_HEADERS = ['Content-Type', 'ETag', 'Last-Modified', 'Retry-After']
+
+class SessionTransport:
+    def __init__(self, pool_size=8):
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The keep-alive session, created on the first request."""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def send(self, method, url, headers=None, data=None):
+        if method.upper() == 'GET':
+            return self.session.get(url, headers=headers)
+        elif method.upper() == 'POST':
+            return self.session.post(url, headers=headers, json=data)
+        else:
+            raise ValueError("Unsupported HTTP method.")
+
+
+class FixtureResponse:
+    """Just enough of requests.Response for FIOAPI."""
+    def __init__(self, status_code, content=b'', headers=None, url=''):
+        from requests.structures import CaseInsensitiveDict
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+def fixture_name(method, url, data=None):
+    """Human-readable fixture filename for a request, independent of the host it was sent to."""
+    parsed_url = urlparse(url)
+    parts = [
+        method.upper(),
+        re.sub(r'\W+', '_', parsed_url.path.strip('/')),
+        re.sub(r'\W+', '_', parsed_url.query),
+        re.sub(r'\W+', '_', urlencode(data)) if data else '',
+    ]
+    return '_'.join(filter(None, parts)).strip('_') + '.json.gz'
+
+
+class RecordingTransport:
+    def __init__(self, inner, fixture_dir):
+        self.inner = inner
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def send(self, method, url, headers=None, data=None):
+        response = self.inner.send(method, url, headers=headers, data=data)
+        if response.status_code == 200:
+            fixture = {
+                'method': method.upper(),
+                'path': urlparse(url).path,
+                'status': response.status_code,
+                'headers': {key: response.headers[key] for key in RECORDED_HEADERS if key in response.headers},
+                'body': response.content.decode('utf-8'),
+            }
+            path = os.path.join(self.fixture_dir, fixture_name(method, url, data))
+            with gzip.open(path, 'wt', encoding='utf-8') as fixture_file:
+                json.dump(fixture, fixture_file)
+        return response
+
+
+class ReplayTransport:
+    """
+    Serve recorded fixtures without touching the network.
+
+    :param latency: Seconds to wait before answering each request.
+    :param rate_limit: (requests, seconds) allowed before answering 429 with Retry-After, or None.
+    """
+    def __init__(self, fixture_dir, latency=0, rate_limit=None):
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.request_times = deque()
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._fixtures = {}
+
+    def _load_fixture(self, name):
+        if name not in self._fixtures:
+            path = os.path.join(self.fixture_dir, name)
+            if not os.path.exists(path):
+                return None
+            with gzip.open(path, 'rt', encoding='utf-8') as fixture_file:
+                self._fixtures[name] = json.load(fixture_file)
+        return self._fixtures[name]
+
+    def _throttle(self):
+        """Return seconds until a slot frees up if the simulated rate limit is exceeded, else None."""
+        if self.rate_limit is None:
+            return None
+        limit, window = self.rate_limit
+        with self._lock:
+            now = time.time()
+            while self.request_times and now - self.request_times[0] > window:
+                self.request_times.popleft()
+            if len(self.request_times) >= limit:
+                return window - (now - self.request_times[0])
+            self.request_times.append(now)
+        return None
+
+    def send(self, method, url, headers=None, data=None):
+        from requests.structures import CaseInsensitiveDict
+        headers = CaseInsensitiveDict(headers or {})
+        with self._lock:
+            self.request_count += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        retry_after = self._throttle()
+        if retry_after is not None:
+            return FixtureResponse(429, b'', {'Retry-After': f"{max(retry_after, 0):.2f}"}, url)
+
+        fixture = self._load_fixture(fixture_name(method, url, data))
+        if fixture is None:
+            return FixtureResponse(404, b'', {}, url)
+
+        etag = fixture['headers'].get('ETag')
+        if etag and headers.get('If-None-Match') == etag:
+            return FixtureResponse(304, b'', fixture['headers'], url)
+
+        return FixtureResponse(fixture['status'], fixture['body'].encode('utf-8'), fixture['headers'], url)
+
+
+def serve(fixture_dir, port=8765, latency=0, rate_limit=None):
+    """Serve fixtures over HTTP as a local stand-in for rest.fnar.net."""
+    replay = ReplayTransport(fixture_dir, latency, rate_limit)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, method):
+            data = None
+            if method == 'POST':
+                length = int(self.headers.get('Content-Length', 0))
+                data = json.loads(self.rfile.read(length) or b'null')
+            response = replay.send(method, f"http://localhost{self.path}", dict(self.headers), data)
+            self.send_response(response.status_code)
+            for key, value in response.headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(response.content)))
+            self.end_headers()
+            self.wfile.write(response.content)
+
+        def do_GET(self):
+            self._respond('GET')
+
+        def do_POST(self):
+            self._respond('POST')
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    print(f"Serving {fixture_dir} at http://127.0.0.1:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def record(fixture_dir):
+    """Capture the datasets the loader and scripts use, bypassing the response cache."""
+    import tempfile
+    from prunpy.api import fio
+    from prunpy.cache import ResponseCache
+    from prunpy.data_loader import DATASET_REQUESTS
+
+    fio.cache = ResponseCache(tempfile.mkdtemp(prefix='prunpy-record-'))
+    fio.transport = RecordingTransport(fio.transport, fixture_dir)
+
+    requests_list = list(DATASET_REQUESTS.values()) + [
+        {'method': 'GET', 'endpoint': '/csv/prices'},
+    ]
+    fio.request_many(requests_list)
+    print(f"Recorded {len(os.listdir(fixture_dir))} fixtures to {fixture_dir}")
+
+
+def bench(fixture_dir, latency=0, rate_limit=None):
+    """Time sequential and concurrent fetches of the loader's raw datasets against replayed fixtures."""
+    import tempfile
+    from prunpy.api import fio, new_rate_limiter
+    from prunpy.cache import ResponseCache
+    from prunpy.data_loader import RAW_DATASET_REQUESTS, EXCHANGE_HISTORY_REQUEST
+
+    requests_list = list(RAW_DATASET_REQUESTS.values()) + [EXCHANGE_HISTORY_REQUEST]
+    requests_list = [{**entry, 'cache': 0, 'message': None} for entry in requests_list]
+
+    # Simulated throttling must not slow down the limiter real runs share through its state file
+    shared_rate_limiter = fio.rate_limiter
+    try:
+        for mode in ['sequential', 'concurrent']:
+            fio.cache = ResponseCache(tempfile.mkdtemp(prefix='prunpy-bench-'))
+            fio.transport = ReplayTransport(fixture_dir, latency, rate_limit)
+            fio.rate_limiter = new_rate_limiter()
+            start = time.time()
+            if mode == 'sequential':
+                for entry in requests_list:
+                    fio.request(**entry)
+            else:
+                fio.request_many(requests_list)
+            elapsed = time.time() - start
+            print(f"{mode:<10}: {len(requests_list)} requests in {elapsed:.2f}s ({fio.transport.request_count} sent)")
+    finally:
+        fio.rate_limiter = shared_rate_limiter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record, replay and benchmark FIO API fixtures")
+    parser.add_argument('command', choices=['record', 'serve', 'bench'])
+    parser.add_argument('--fixtures', default='./fixtures', help="Fixture directory")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help="Seconds added to every replayed response")
+    parser.add_argument('--rate-limit', type=float, nargs=2, metavar=('REQUESTS', 'SECONDS'), default=None)
+    args = parser.parse_args()
+
+    rate_limit = tuple(args.rate_limit) if args.rate_limit else None
+    if args.command == 'record':
+        record(args.fixtures)
+    elif args.command == 'serve':
+        serve(args.fixtures, args.port, args.latency, rate_limit)
+    elif args.command == 'bench':
+        bench(args.fixtures, args.latency, rate_limit)
+    else:
+        sys.exit(1)
@@ -0,0 +1,77 @@
+import csv
+from io import StringIO
+
+def infer_value(value):
+    """Coerce a CSV cell the way pandas would: bools, ints and floats, with empty cells as None."""
+    if value == '':
+        return None
+    if value in ['True', 'TRUE', 'true']:
+        return True
+    if value in ['False', 'FALSE', 'false']:
+        return False
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def to_number(value):
+    """Numeric column. Empty cells become NaN so comparisons stay False, as they did with pandas."""
+    if value == '':
+        return float('nan')
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def to_str(value):
+    return value
+
+# Column types for known CSV endpoints. '*' applies to every column not listed.
+# Columns of endpoints not listed here are inferred with infer_value.
+CSV_COLUMN_TYPES = {
+    '/csv/systemlinks': {
+        'Left': to_str,
+        'Right': to_str,
+    },
+    '/csv/infrastructure/allreports': {
+        'PlanetNaturalId': to_str,
+        'PlanetName': to_str,
+        '*': to_number,
+    },
+    '/csv/prices': {
+        'Ticker': to_str,
+    },
+}
+
+def iter_csv_records(text, column_types=None):
+    """
+    Lazily parse CSV text into one dict per row, keyed by the header row.
+
+    :param text: The CSV document.
+    :param column_types: {column: coerce_function}, with an optional '*' default.
+    :return: A generator of dicts.
+    """
+    column_types = column_types or {}
+    default_type = column_types.get('*', infer_value)
+
+    reader = csv.reader(StringIO(text))
+    header = next(reader, None)
+    if header is None:
+        return
+
+    coercers = [column_types.get(column, default_type) for column in header]
+    for row in reader:
+        if not row:
+            continue
+        yield {column: coerce(value) for column, coerce, value in zip(header, coercers, row)}
+
+def get_column_types(endpoint):
+    return CSV_COLUMN_TYPES.get('/' + endpoint.strip('/'), {})
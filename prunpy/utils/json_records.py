@@ -0,0 +1,26 @@
+import json
+
+def iter_json_items(stream):
+    """
+    Lazily parse the items of a top-level JSON array from a binary stream.
+
+    With ijson installed, items are decoded one at a time, so only the current record
+    is ever held in memory. Without it, the whole document is parsed first.
+
+    :param stream: A binary file-like object.
+    :return: A generator of the array's items.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is not None:
+        # use_float keeps numbers as floats, matching json.loads, instead of Decimals
+        yield from ijson.items(stream, 'item', use_float=True)
+        return
+
+    document = json.load(stream)
+    if not isinstance(document, list):
+        raise ValueError("Expected a JSON array")
+    yield from document
@@ -0,0 +1,85 @@
+import difflib
+from bisect import bisect_left
+
+def normalize(text):
+    return text.strip().casefold()
+
+class PlanetIndex:
+    """
+    Case-insensitive lookup of planets by name, natural id or system, built once from the raw
+    planet records. Everything resolves to natural ids, e.g. 'montem' -> 'OT-580b'.
+
+    Also answers prefix and fuzzy searches, for matching what users type on the command line.
+    """
+    # How close a fuzzy match must be, from 0 to 1 (see difflib.get_close_matches)
+    FUZZY_CUTOFF = 0.6
+
+    def __init__(self, planet_records):
+        self.names = {}  # {natural_id: name}
+        self.exact = {}  # {normalized name or natural id: natural_id}
+        self.systems = {}  # {normalized SystemId or system natural id: [natural_id, ...]}
+
+        for planet in planet_records:
+            natural_id = planet['PlanetNaturalId']
+            name = planet.get('PlanetName') or natural_id
+            self.names[natural_id] = name
+
+            # Natural ids win over names if a planet was ever named after another's id
+            self.exact.setdefault(normalize(name), natural_id)
+            self.exact[normalize(natural_id)] = natural_id
+
+            system_natural_id = natural_id[:-1]  # e.g. OT-580b is in system OT-580
+            for system in {normalize(system_natural_id), normalize(planet.get('SystemId') or '')} - {''}:
+                self.systems.setdefault(system, []).append(natural_id)
+
+        # Sorted for prefix search with bisect
+        self._sorted_keys = sorted(self.exact)
+
+    def resolve(self, text):
+        """The natural id of the planet named or identified by text, or None."""
+        return self.exact.get(normalize(text))
+
+    def search(self, prefix):
+        """Natural ids of planets whose name or natural id starts with prefix, in alphabetical order of the match."""
+        prefix = normalize(prefix)
+        matches = []
+        for i in range(bisect_left(self._sorted_keys, prefix), len(self._sorted_keys)):
+            key = self._sorted_keys[i]
+            if not key.startswith(prefix):
+                break
+            natural_id = self.exact[key]
+            if natural_id not in matches:
+                matches.append(natural_id)
+        return matches
+
+    def match(self, text):
+        """The natural id text refers to: an exact match, or else the only planet it's a prefix of. None if ambiguous."""
+        natural_id = self.resolve(text)
+        if natural_id is not None:
+            return natural_id
+
+        matches = self.search(text)
+        return matches[0] if len(matches) == 1 else None
+
+    def suggest(self, text, limit=5):
+        """Natural ids of the planets text most likely meant: prefix matches, or failing that, close spellings."""
+        matches = self.search(text)
+        if not matches:
+            close_keys = difflib.get_close_matches(normalize(text), self._sorted_keys, n=limit*2, cutoff=self.FUZZY_CUTOFF)
+            matches = list(dict.fromkeys(self.exact[key] for key in close_keys))
+        return matches[:limit]
+
+    def in_system(self, system):
+        """Natural ids of the planets in a system, given its natural id (e.g. OT-580) or SystemId."""
+        return list(self.systems.get(normalize(system), []))
+
+    def describe(self, natural_id):
+        """'Name (natural id)' for named planets, else just the natural id."""
+        name = self.names[natural_id]
+        return natural_id if name == natural_id else f"{name} ({natural_id})"
+
+    def __contains__(self, text):
+        return self.resolve(text) is not None
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,78 @@
+import io
+import os
+import csv
+import threading
+
+from prunpy.utils.file_lock import file_lock
+
+class SharedCsvCache:
+    """
+    A dict of derived values persisted as an append-only CSV file, safe to share
+    between processes. Appends happen under a file lock after catching up on rows
+    other processes wrote, so a key is only ever written once.
+
+    :param path: The CSV file.
+    :param header: Column names, keys first, then the value.
+    :param parse_value: Converts the stored value column back from a string.
+    """
+    def __init__(self, path, header, parse_value=str):
+        self.path = path
+        self.header = list(header)
+        self.key_columns = len(self.header) - 1
+        self.parse_value = parse_value
+
+        self.data = {}
+        self._offset = 0  # Bytes of the file already read
+        self._lock = threading.RLock()
+
+    def _read_new_rows(self):
+        """Pick up rows appended since the last read, including ones from other processes."""
+        try:
+            with open(self.path, 'rb') as csv_file:
+                csv_file.seek(self._offset)
+                new_bytes = csv_file.read()
+        except FileNotFoundError:
+            return
+
+        # A row still being written by another process is left for the next read
+        end = new_bytes.rfind(b'\n') + 1
+        self._offset += end
+
+        for row in csv.reader(io.StringIO(new_bytes[:end].decode('utf-8'))):
+            if row == self.header or len(row) != len(self.header):
+                continue
+            try:
+                self.data[tuple(row[:self.key_columns])] = self.parse_value(row[-1])
+            except ValueError:
+                continue  # Skip rows mangled by writers that didn't lock
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self.data:
+                self._read_new_rows()
+            return self.data.get(key, default)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def add(self, key, value):
+        """Store value under key unless another process already has. Returns the stored value."""
+        with self._lock, file_lock(self.path + '.lock'):
+            self._read_new_rows()
+            if key in self.data:
+                return self.data[key]
+
+            write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, 'a', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                if write_header:
+                    writer.writerow(self.header)
+                writer.writerow(list(key) + [value])
+            self.data[key] = value
+            return value
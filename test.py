@@ -968,6 +968,45 @@ def test_resource_list_expand():
     print(f"Result weight: {expanded.weight}")
     print(f"Result volume: {expanded.volume}")
 
+# Seconds a bare `import prunpy` may take in a fresh interpreter
+IMPORT_TIME_BUDGET = 0.2
+
+def test_import_time():
+    import os
+    import sys
+    import tempfile
+    import subprocess
+    print("\nTesting import time of prunpy")
+
+    # Run in an empty directory with no apikey.txt and no terminal, like a headless worker
+    # Any prompt would fail on the closed stdin
+    package_dir = os.path.dirname(os.path.abspath(prunpy.__file__))
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import prunpy\n"
+        "print(time.perf_counter() - start)\n"
+        "print(','.join(m for m in ['requests', 'numpy', 'pandas', 'scipy', 'prunpy.api'] if m in sys.modules))\n"
+        "start = time.perf_counter()\n"
+        "fio = prunpy.fio\n"
+        "print(time.perf_counter() - start)\n"
+        "print(fio.api_key)\n"
+    )
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(package_dir))
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=work_dir, env=env,
+            stdin=subprocess.DEVNULL, capture_output=True, text=True, check=True,
+        )
+        created = os.listdir(work_dir)
+    import_time, loaded, client_time, api_key = result.stdout.split('\n')[:4]
+
+    print(f"import prunpy: {float(import_time)*1000:.1f}ms (budget {IMPORT_TIME_BUDGET*1000:.0f}ms)")
+    print(f"prunpy.fio: {float(client_time)*1000:.1f}ms")
+    assert float(import_time) < IMPORT_TIME_BUDGET, f"import prunpy took {float(import_time):.3f}s"
+    assert not loaded, f"import prunpy loaded {loaded}"
+    assert not created, f"import prunpy created {created}"
+    assert api_key == 'None', "The API key should only be resolved by the first request"
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import prunpy
-import importlib
 import json
 import time
 import sys
@@ -73,7 +72,8 @@ def main():
 
         # Loop
         while True:
-            importlib.reload(prunpy)
+            # Only exchange data is reloaded; materials, buildings and planets stay loaded
+            prunpy.loader.refresh('exchange')
             check_orders()
             time.sleep(15*60+10)  # Sleep for 15 minutes (900 seconds)
     else: